@@ -14,6 +14,8 @@ async def pm_broadcast(bot, message):
     owner = await db.get_bot(me.id)
     if owner["user_id"] != message.from_user.id:
         return 
+    # `/broadcast dry` sends as usual but only reports dead users instead of deleting them
+    dry_run = 'dry' in message.command[1:]
     b_msg = await bot.ask(chat_id = message.from_user.id, text = "Now Send Me Your Broadcast Message")
     try:
         users = await clonedb.get_all_users(me.id)
@@ -25,9 +27,17 @@ async def pm_broadcast(bot, message):
         deleted = 0
         failed = 0
         success = 0
+        dead = []
+        dead_total = 0
         async for user in users:
             if 'user_id' in user:
-                pti, sh = await broadcast_messages(me.id, int(user['user_id']), b_msg)
+                pti, sh = await broadcast_messages(int(user['user_id']), b_msg)
+                if sh in ("Deleted", "Blocked", "Invalid"):
+                    dead.append(user['user_id'])
+                    dead_total += 1
+                    if len(dead) >= 100 and not dry_run:
+                        await clonedb.delete_users(me.id, dead)
+                        dead = []
                 if pti:
                     success += 1
                 elif pti == False:
@@ -35,7 +45,7 @@ async def pm_broadcast(bot, message):
                         blocked += 1
                     elif sh == "Deleted":
                         deleted += 1
-                    elif sh == "Error":
+                    elif sh in ("Error", "Invalid"):
                         failed += 1
                 done += 1
                 if not done % 20:
@@ -47,29 +57,29 @@ async def pm_broadcast(bot, message):
                 if not done % 20:
                     await sts.edit(f"Broadcast in progress:\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")    
     
+        if not dry_run:
+            await clonedb.delete_users(me.id, dead)
         time_taken = datetime.timedelta(seconds=int(time.time()-start_time))
-        await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users: {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")
+        dry_text = f"\nDead Users Kept (Dry Run): {dead_total}" if dry_run else ""
+        await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users: {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}{dry_text}")
     except Exception as e:
         print(f"error: {e}")
 
 
 
-async def broadcast_messages(bot_id, user_id, message):
+async def broadcast_messages(user_id, message):
+    """Copy message to user_id, dead users are reported back and deleted by the caller."""
     try:
         await message.copy(chat_id=user_id)
         return True, "Success"
     except FloodWait as e:
         await asyncio.sleep(e.value)
-        return await broadcast_messages(bot_id, user_id, message)
+        return await broadcast_messages(user_id, message)
     except InputUserDeactivated:
-        await clonedb.delete_user(bot_id, user_id)
         return False, "Deleted"
     except UserIsBlocked:
-        await clonedb.delete_user(bot_id, user_id)
         return False, "Blocked"
     except PeerIdInvalid:
-        await clonedb.delete_user(bot_id, user_id)
-        return False, "Error"
+        return False, "Invalid"
     except Exception as e:
-        await clonedb.delete_user(bot_id, user_id)
         return False, "Error"
@@ -25,5 +25,9 @@ class Database:
     async def delete_user(self, bot_id, user_id):
         await self.db[str(bot_id)].delete_many({'user_id': int(user_id)})
 
+    async def delete_users(self, bot_id, user_ids):
+        if user_ids:
+            await self.db[str(bot_id)].delete_many({'user_id': {'$in': [int(user_id) for user_id in user_ids]}})
+
 
 clonedb = Database(CLONE_DATABASE_URI, DATABASE_NAME)
@@ -12,7 +12,7 @@ from pyrogram.errors import FloodWait, UserIsBlocked, MessageNotModified, PeerId
 from pyrogram.errors.exceptions.bad_request_400 import MediaEmpty, PhotoInvalidDimensions, WebpageMediaEmpty
 from utils import get_size, is_subscribed, pub_is_subscribed, get_poster, search_gagala, temp, get_settings, save_group_settings, get_shortlink, get_tutorial, send_all, get_cap
 from database.users_chats_db import db
-from database.ia_filterdb import get_file_details, get_search_results, get_bad_files
+from database.ia_filterdb import get_file_details, get_search_results, get_bad_files, get_offset_position, get_back_offset
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
@@ -44,23 +44,18 @@ async def pm_text(bot, message):
     
 @Client.on_callback_query(filters.regex(r"^next"))
 async def next_page(bot, query):
-    ident, req, key, offset = query.data.split("_")
+    ident, req, key, cursor = query.data.split("_")
     curr_time = datetime.now(pytz.timezone('Asia/Kolkata')).time()
     if int(req) not in [query.from_user.id, 0]:
         return await query.answer(script.ALRT_TXT.format(query.from_user.first_name), show_alert=True)
-    try:
-        offset = int(offset)
-    except:
-        offset = 0
+    offset = get_offset_position(cursor)
     search = FRESH.get(key)
   #  if not search:
      #   await query.answer(script.OLD_ALRT_TXT.format(query.from_user.first_name),show_alert=True)
     #    return
 
-    files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=offset, filter=True)
-    try:
-        n_offset = int(n_offset)
-    except:
+    files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=cursor, filter=True)
+    if not n_offset:
         n_offset = 0
 
     if not files:
@@ -93,7 +88,7 @@ async def next_page(bot, query):
     elif offset == 0:
         off_set = None
     else:
-        off_set = offset - int(MAX_B_TN)
+        off_set = get_back_offset(cursor, files)
     if n_offset == 0:
         btn.append(
             [InlineKeyboardButton("⌫ 𝐁𝐀𝐂𝐊", callback_data=f"next_{req}_{key}_{off_set}"), InlineKeyboardButton(f"{math.ceil(int(offset)/int(MAX_B_TN))+1} / {math.ceil(total/int(MAX_B_TN))}", callback_data="pages")]
@@ -828,13 +823,13 @@ async def cb_handler(client: Client, query: CallbackQuery):
         if not search:
             await query.answer(script.OLD_ALRT_TXT.format(query.from_user.first_name),show_alert=True)
             return
-        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=int(offset), filter=True)
+        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=offset, filter=True)
         await send_all(client, query.from_user.id, files, ident, query.message.chat.id, query.from_user.first_name, query)
         search = BUTTONS1.get(key)
-        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=int(offset), filter=True)
+        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=offset, filter=True)
         await send_all(client, query.from_user.id, files, ident, query.message.chat.id, query.from_user.first_name, query)
         search = BUTTONS2.get(key)
-        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=int(offset), filter=True)
+        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=offset, filter=True)
         await send_all(client, query.from_user.id, files, ident, query.message.chat.id, query.from_user.first_name, query)
         await query.answer(f"Hey {query.from_user.first_name}, All files on this page has been sent successfully to your PM !", show_alert=True)
         
@@ -844,7 +839,7 @@ async def cb_handler(client: Client, query: CallbackQuery):
        # if not search:
         #    await query.answer(script.OLD_ALRT_TXT.format(query.from_user.first_name),show_alert=True)
            # return
-        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=int(offset), filter=True)
+        files, n_offset, total = await get_search_results(query.message.chat.id, search, offset=offset, filter=True)
         await send_all(client, query.from_user.id, files, ident, query.message.chat.id, query.from_user.first_name, query)
         await query.answer(f"Hey {query.from_user.first_name}, All files on this page has been sent successfully to your PM !", show_alert=True)
 
@@ -66,3 +66,6 @@ ZahidBot = ZahidXBot()
 
 multi_clients = {}
 work_loads = {}
+# Bytes each client still has to stream, and its recent throughput in bytes/sec
+work_bytes = {}
+client_speeds = {}
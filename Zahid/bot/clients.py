@@ -5,12 +5,35 @@ import logging
 from info import *
 from pyrogram import Client
 from Zahid.util.config_parser import TokenParser
-from Zahid.bot import multi_clients, work_loads, ZahidBot
+from Zahid.bot import multi_clients, work_loads, work_bytes, client_speeds, ZahidBot
+from Zahid.util.custom_dl import warm_media_sessions
+
+# Speed assumed for a client that has not streamed yet, and the cost in seconds of a DC handshake
+DEFAULT_CLIENT_SPEED = 1024 * 1024
+COLD_DC_PENALTY = 1.5
+
+
+def select_client(dc_id=None):
+    """Pick the client expected to start a new stream soonest.
+
+    Each client is scored by the seconds it needs to drain the bytes it is already
+    streaming at its recent speed, plus a penalty when it has no media session for dc_id yet.
+    """
+    def cost(index):
+        speed = client_speeds.get(index) or DEFAULT_CLIENT_SPEED
+        pending = work_bytes.get(index, 0) + work_loads[index] * 1024 * 1024
+        penalty = 0
+        if dc_id is not None and dc_id not in multi_clients[index].media_sessions:
+            penalty = COLD_DC_PENALTY
+        return pending / speed + penalty
+    return min(work_loads, key=cost)
 
 
 async def initialize_clients():
     multi_clients[0] = ZahidBot
     work_loads[0] = 0
+    work_bytes[0] = 0
+    asyncio.create_task(warm_media_sessions(ZahidBot, STREAM_WARM_DCS))
     all_tokens = TokenParser().parse_from_env()
     if not all_tokens:
         print("No additional clients found, using default client")
@@ -32,6 +55,8 @@ async def initialize_clients():
                 in_memory=True
             ).start()
             work_loads[client_id] = 0
+            work_bytes[client_id] = 0
+            asyncio.create_task(warm_media_sessions(client, STREAM_WARM_DCS))
             return client_id, client
         except Exception:
             logging.error(f"Failed starting Client - {client_id} Error:", exc_info=True)
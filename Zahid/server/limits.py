@@ -0,0 +1,84 @@
+from aiohttp import web
+from info import STREAM_MAX_PER_IP, STREAM_RATE_PER_CONNECTION, STREAM_RATE_PER_FILE, STREAM_MAX_INFLIGHT_MB, STREAM_TRUST_PROXY
+from Zahid.util.rate_limit import TokenBucket
+from Zahid.bot import work_bytes
+from Zahid.util.metrics import bytes_served
+
+# Bytes sent per bucket acquire, small enough to keep shaped streams smooth
+SHAPE_SLICE = 64 * 1024
+
+# ip -> number of streams it has open
+ip_streams = {}
+# file unique id -> [shared bandwidth bucket, number of streams using it]
+file_buckets = {}
+
+
+def get_client_ip(request: web.Request) -> str:
+    if STREAM_TRUST_PROXY:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.remote
+
+
+def check_stream_limits(ip: str, length: int = 0):
+    """Return a 429/503 response when a new stream must not start, else None."""
+    if STREAM_MAX_PER_IP and ip_streams.get(ip, 0) >= STREAM_MAX_PER_IP:
+        return web.Response(
+            status=429,
+            text="429: Too many streams from your address",
+            headers={"Retry-After": "5"},
+        )
+    in_flight = sum(work_bytes.values())
+    if STREAM_MAX_INFLIGHT_MB and in_flight and in_flight + length > STREAM_MAX_INFLIGHT_MB * 1024 * 1024:
+        return web.Response(
+            status=503,
+            text="503: Server busy, try again shortly",
+            headers={"Retry-After": "10"},
+        )
+    return None
+
+
+async def serve_stream(request: web.Request, status: int, headers: dict, body, file_key: str, length: int):
+    """Stream body to the client under the per-IP, per-connection and per-file limits."""
+    ip = get_client_ip(request)
+    limited = check_stream_limits(ip, length)
+    if limited:
+        return limited
+
+    buckets = []
+    if STREAM_RATE_PER_CONNECTION:
+        buckets.append(TokenBucket(STREAM_RATE_PER_CONNECTION * 1024))
+    if STREAM_RATE_PER_FILE:
+        if file_key not in file_buckets:
+            file_buckets[file_key] = [TokenBucket(STREAM_RATE_PER_FILE * 1024), 0]
+        file_buckets[file_key][1] += 1
+        buckets.append(file_buckets[file_key][0])
+
+    ip_streams[ip] = ip_streams.get(ip, 0) + 1
+    response = web.StreamResponse(status=status, headers=headers)
+    try:
+        await response.prepare(request)
+        async for chunk in body:
+            if not buckets:
+                await response.write(chunk)
+                bytes_served.inc(len(chunk))
+                continue
+            for start in range(0, len(chunk), SHAPE_SLICE):
+                piece = chunk[start:start + SHAPE_SLICE]
+                for bucket in buckets:
+                    await bucket.acquire(len(piece))
+                await response.write(piece)
+                bytes_served.inc(len(piece))
+        await response.write_eof()
+    finally:
+        # Also runs when the client disconnects mid-stream
+        await body.aclose()
+        ip_streams[ip] -= 1
+        if not ip_streams[ip]:
+            del ip_streams[ip]
+        if STREAM_RATE_PER_FILE:
+            file_buckets[file_key][1] -= 1
+            if not file_buckets[file_key][1]:
+                del file_buckets[file_key]
+    return response
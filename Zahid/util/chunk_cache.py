@@ -0,0 +1,96 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from info import STREAM_CACHE_DIR, STREAM_CACHE_SIZE
+
+
+class ChunkCache:
+    def __init__(self, path: str, max_bytes: int):
+        """An on-disk LRU cache of streamed chunks keyed by (media_id, part).
+        The cache is bounded by the total size of the stored chunks, and concurrent
+        misses for the same chunk share one Telegram fetch.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[tuple, int]" = OrderedDict()
+        self.pending: dict = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        self.load()
+
+    def load(self) -> None:
+        """Pick up chunks left on disk by an earlier run, oldest first."""
+        files = []
+        for name in os.listdir(self.path):
+            media_id, _, part = name.partition("_")
+            if not (media_id.lstrip("-").isdigit() and part.isdigit()):
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            files.append((stat.st_mtime, (int(media_id), int(part)), stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.size += size
+        self.evict()
+
+    def file_path(self, key: tuple) -> str:
+        return os.path.join(self.path, f"{key[0]}_{key[1]}")
+
+    def read(self, key: tuple) -> bytes:
+        with open(self.file_path(key), "rb") as f:
+            return f.read()
+
+    def write(self, key: tuple, chunk: bytes) -> None:
+        tmp_path = self.file_path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(chunk)
+        os.replace(tmp_path, self.file_path(key))
+
+    def discard(self, key: tuple) -> None:
+        self.size -= self.entries.pop(key, 0)
+        try:
+            os.remove(self.file_path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        while self.size > self.max_bytes and self.entries:
+            self.discard(next(iter(self.entries)))
+
+    async def get(self, media_id: int, part: int, fetch) -> bytes:
+        """Return a chunk from disk, or fetch it once however many streams are waiting for it."""
+        key = (media_id, part)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            try:
+                chunk = await asyncio.to_thread(self.read, key)
+                self.hits += 1
+                return chunk
+            except OSError:
+                self.discard(key)
+        if key not in self.pending:
+            self.misses += 1
+            self.pending[key] = asyncio.create_task(self.fill(key, fetch))
+        # A disconnecting stream must not cancel a fetch other streams are waiting on
+        return await asyncio.shield(self.pending[key])
+
+    async def fill(self, key: tuple, fetch) -> bytes:
+        try:
+            chunk = await fetch()
+            if chunk and len(chunk) <= self.max_bytes:
+                try:
+                    await asyncio.to_thread(self.write, key, chunk)
+                    self.size -= self.entries.pop(key, 0)
+                    self.entries[key] = len(chunk)
+                    self.size += len(chunk)
+                    self.evict()
+                except OSError as e:
+                    logging.warning(f"Could not cache chunk {key}: {e}")
+            return chunk
+        finally:
+            self.pending.pop(key, None)
+
+
+chunk_cache = ChunkCache(STREAM_CACHE_DIR, STREAM_CACHE_SIZE * 1024 * 1024) if STREAM_CACHE_DIR else None
@@ -1,24 +1,77 @@
 import math
+import time
 import asyncio
 import logging
+from collections import deque, OrderedDict
 from info import *
 from typing import Dict, Union
-from Zahid.bot import work_loads
+from Zahid.bot import work_loads, work_bytes, client_speeds
 from pyrogram import Client, utils, raw
 from Zahid.util.file_properties import get_file_ids
+from Zahid.util.chunk_cache import chunk_cache
+from Zahid.util.metrics import chunk_fetch_seconds
 from pyrogram.session import Session, Auth
 from pyrogram.errors import AuthBytesInvalid
 from Zahid.server.exceptions import FIleNotFound
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
 
 
+class FilePropertiesCache:
+    def __init__(self, max_size: int, ttl: int):
+        """A bounded LRU of file properties shared by every ByteStreamer.
+        Entries expire one by one after `ttl` seconds, and concurrent misses
+        for the same key wait on a single fetch.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: tuple, fetch) -> FileId:
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self.entries[key]
+        if key not in self.pending:
+            self.misses += 1
+            self.pending[key] = asyncio.create_task(self.fill(key, fetch))
+        return await asyncio.shield(self.pending[key])
+
+    async def fill(self, key: tuple, fetch) -> FileId:
+        try:
+            value = await fetch()
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            return value
+        finally:
+            self.pending.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+file_properties_cache = FilePropertiesCache(FILE_PROPERTIES_CACHE_SIZE, FILE_PROPERTIES_CACHE_TIME)
+
+
 class ByteStreamer:
     def __init__(self, client: Client):
         """A custom class that holds the cache of a specific client and class functions.
         attributes:
             client: the client that the cache is for.
-            cached_file_ids: a dict of cached file IDs.
-            cached_file_properties: a dict of cached file properties.
+            file properties are cached in the shared file_properties_cache.
         
         functions:
             generate_file_properties: returns the properties for a media of a specific message contained in Tuple.
@@ -28,10 +81,7 @@ class ByteStreamer:
         This is a modified version of the <https://github.com/eyaadh/megadlbot_oss/blob/master/mega/telegram/utils/custom_download.py>
         Thanks to Eyaadh <https://github.com/eyaadh>
         """
-        self.clean_timer = 30 * 60
         self.client: Client = client
-        self.cached_file_ids: Dict[int, FileId] = {}
-        asyncio.create_task(self.clean_cache())
 
     async def get_file_properties(self, id: int) -> FileId:
         """
@@ -39,10 +89,10 @@ class ByteStreamer:
         if the properties are cached, then it'll return the cached results.
         or it'll generate the properties from the Message ID and cache them.
         """
-        if id not in self.cached_file_ids:
-            await self.generate_file_properties(id)
-            logging.debug(f"Cached file properties for message with ID {id}")
-        return self.cached_file_ids[id]
+        # File ids carry per-bot file references, so entries are kept per client
+        return await file_properties_cache.get(
+            (self.client.name, id), lambda: self.generate_file_properties(id)
+        )
     
     async def generate_file_properties(self, id: int) -> FileId:
         """
@@ -54,25 +104,30 @@ class ByteStreamer:
         if not file_id:
             logging.debug(f"Message with ID {id} not found")
             raise FIleNotFound
-        self.cached_file_ids[id] = file_id
         logging.debug(f"Cached media message with ID {id}")
-        return self.cached_file_ids[id]
+        return file_id
 
     async def generate_media_session(self, client: Client, file_id: FileId) -> Session:
         """
         Generates the media session for the DC that contains the media file.
         This is required for getting the bytes from Telegram servers.
         """
+        return await self.get_dc_media_session(client, file_id.dc_id)
 
-        media_session = client.media_sessions.get(file_id.dc_id, None)
+    @staticmethod
+    async def get_dc_media_session(client: Client, dc_id: int) -> Session:
+        """
+        Returns the cached media session of a client for a DC, creating it on first use.
+        """
+        media_session = client.media_sessions.get(dc_id, None)
 
         if media_session is None:
-            if file_id.dc_id != await client.storage.dc_id():
+            if dc_id != await client.storage.dc_id():
                 media_session = Session(
                     client,
-                    file_id.dc_id,
+                    dc_id,
                     await Auth(
-                        client, file_id.dc_id, await client.storage.test_mode()
+                        client, dc_id, await client.storage.test_mode()
                     ).create(),
                     await client.storage.test_mode(),
                     is_media=True,
@@ -81,7 +136,7 @@ class ByteStreamer:
 
                 for _ in range(6):
                     exported_auth = await client.invoke(
-                        raw.functions.auth.ExportAuthorization(dc_id=file_id.dc_id)
+                        raw.functions.auth.ExportAuthorization(dc_id=dc_id)
                     )
 
                     try:
@@ -93,7 +148,7 @@ class ByteStreamer:
                         break
                     except AuthBytesInvalid:
                         logging.debug(
-                            f"Invalid authorization bytes for DC {file_id.dc_id}"
+                            f"Invalid authorization bytes for DC {dc_id}"
                         )
                         continue
                 else:
@@ -102,19 +157,35 @@ class ByteStreamer:
             else:
                 media_session = Session(
                     client,
-                    file_id.dc_id,
+                    dc_id,
                     await client.storage.auth_key(),
                     await client.storage.test_mode(),
                     is_media=True,
                 )
                 await media_session.start()
-            logging.debug(f"Created media session for DC {file_id.dc_id}")
-            client.media_sessions[file_id.dc_id] = media_session
+            logging.debug(f"Created media session for DC {dc_id}")
+            client.media_sessions[dc_id] = media_session
         else:
-            logging.debug(f"Using cached media session for DC {file_id.dc_id}")
+            logging.debug(f"Using cached media session for DC {dc_id}")
         return media_session
 
 
+    @staticmethod
+    async def fetch_chunk(media_session: Session, location, offset: int, chunk_size: int) -> Union[bytes, None]:
+        """
+        Requests one chunk of the media file from telegram servers.
+        """
+        start = time.perf_counter()
+        r = await media_session.send(
+            raw.functions.upload.GetFile(
+                location=location, offset=offset, limit=chunk_size
+            ),
+        )
+        chunk_fetch_seconds.observe(time.perf_counter() - start)
+        if isinstance(r, raw.types.upload.File):
+            return r.bytes
+        return None
+
     @staticmethod
     async def get_location(file_id: FileId) -> Union[raw.types.InputPhotoFileLocation,
                                                      raw.types.InputDocumentFileLocation,
@@ -177,55 +248,73 @@ class ByteStreamer:
         """
         client = self.client
         work_loads[index] += 1
+        remaining = part_count * chunk_size
+        work_bytes[index] = work_bytes.get(index, 0) + remaining
         logging.debug(f"Starting to yielding file with client {index}.")
         media_session = await self.generate_media_session(client, file_id)
 
         current_part = 1
         location = await self.get_location(file_id)
+        # Keep up to STREAM_PREFETCH GetFile requests in flight, chunks are still yielded in order
+        window = deque()
+
+        def request_part():
+            nonlocal offset
+            part_offset = offset
+            fetch = lambda: self.fetch_chunk(media_session, location, part_offset, chunk_size)
+            if chunk_cache:
+                window.append(asyncio.create_task(chunk_cache.get(file_id.media_id, part_offset // chunk_size, fetch)))
+            else:
+                window.append(asyncio.create_task(fetch()))
+            offset += chunk_size
 
         try:
-            r = await media_session.send(
-                raw.functions.upload.GetFile(
-                    location=location, offset=offset, limit=chunk_size
-                ),
-            )
-            if isinstance(r, raw.types.upload.File):
-                while True:
-                    chunk = r.bytes
-                    if not chunk:
-                        break
-                    elif part_count == 1:
-                        yield chunk[first_part_cut:last_part_cut]
-                    elif current_part == 1:
-                        yield chunk[first_part_cut:]
-                    elif current_part == part_count:
-                        yield chunk[:last_part_cut]
-                    else:
-                        yield chunk
-
-                    current_part += 1
-                    offset += chunk_size
-
-                    if current_part > part_count:
-                        break
+            while len(window) < min(max(STREAM_PREFETCH, 1), part_count):
+                request_part()
+            last_chunk_at = time.monotonic()
+            while window:
+                chunk = await window.popleft()
+                if current_part + len(window) < part_count:
+                    request_part()
+                if not chunk:
+                    break
+                now = time.monotonic()
+                speed = len(chunk) / max(now - last_chunk_at, 0.001)
+                client_speeds[index] = client_speeds[index] * 0.8 + speed * 0.2 if client_speeds.get(index) else speed
+                last_chunk_at = now
+                remaining -= chunk_size
+                work_bytes[index] -= chunk_size
 
-                    r = await media_session.send(
-                        raw.functions.upload.GetFile(
-                            location=location, offset=offset, limit=chunk_size
-                        ),
-                    )
+                if part_count == 1:
+                    yield chunk[first_part_cut:last_part_cut]
+                elif current_part == 1:
+                    yield chunk[first_part_cut:]
+                elif current_part == part_count:
+                    yield chunk[:last_part_cut]
+                else:
+                    yield chunk
+
+                current_part += 1
+
+                if current_part > part_count:
+                    break
         except (TimeoutError, AttributeError):
             pass
         finally:
-            logging.debug("Finished yielding file with {current_part} parts.")
+            # Runs too when the HTTP client disconnects and the generator is closed
+            for task in window:
+                task.cancel()
+                if task.done() and not task.cancelled():
+                    task.exception()
+            logging.debug(f"Finished yielding file with {current_part} parts.")
             work_loads[index] -= 1
+            work_bytes[index] -= remaining
 
-    
-    async def clean_cache(self) -> None:
-        """
-        function to clean the cache to reduce memory usage
-        """
-        while True:
-            await asyncio.sleep(self.clean_timer)
-            self.cached_file_ids.clear()
-            logging.debug("Cleaned the cache")
+
+async def warm_media_sessions(client: Client, dc_ids) -> None:
+    """Open a client's media sessions ahead of time so the first stream from a DC skips the auth handshake."""
+    for dc_id in dc_ids:
+        try:
+            await ByteStreamer.get_dc_media_session(client, dc_id)
+        except Exception as e:
+            logging.warning(f"Could not warm media session for DC {dc_id}: {e}")
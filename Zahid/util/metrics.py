@@ -0,0 +1,160 @@
+import time
+import asyncio
+import functools
+import threading
+from pymongo import monitoring
+
+
+class Counter:
+    def __init__(self, name: str, help: str, func=None):
+        """A monotonically increasing value per label set.
+        With func the values are read from it when /metrics is scraped, like a Gauge."""
+        self.name = name
+        self.help = help
+        self.func = func
+        self.values = {}
+        # inc is also called from pymongo's monitoring threads
+        self.lock = threading.Lock()
+        register(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# TYPE {self.name} counter"
+        if self.func:
+            values = self.func().items()
+        else:
+            with self.lock:
+                values = list(self.values.items())
+        for key, value in values:
+            yield f"{self.name}{format_labels(key)} {value}"
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, func):
+        """A value read when /metrics is scraped, func returns a number or {labels tuple: number}."""
+        self.name = name
+        self.help = help
+        self.func = func
+        register(self)
+
+    def render(self):
+        yield f"# TYPE {self.name} gauge"
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            yield f"{self.name}{format_labels(key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        """Observations counted into cumulative `le` buckets, plus their sum and count."""
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+        register(self)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self, func):
+        """Decorator that observes how long an async function takes."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+        return wrapper
+
+    def render(self):
+        yield f"# TYPE {self.name} histogram"
+        for bound, count in zip(self.buckets, self.counts):
+            yield f'{self.name}_bucket{{le="{bound}"}} {count}'
+        yield f'{self.name}_bucket{{le="+Inf"}} {self.count}'
+        yield f"{self.name}_sum {self.sum}"
+        yield f"{self.name}_count {self.count}"
+
+
+def register(metric) -> None:
+    """Add a metric to /metrics, ignoring a name that is already registered.
+    Plugins are executed twice at startup, so their metrics are created twice."""
+    if metric.name not in metrics:
+        metrics[metric.name] = metric
+
+
+def format_labels(key) -> str:
+    if not key:
+        return ""
+    labels = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        labels.append(f'{name}="{value}"')
+    return "{" + ",".join(labels) + "}"
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in metrics.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# metric name -> metric
+metrics = {}
+
+bytes_served = Counter("stream_bytes_served_total", "Bytes written to stream clients.")
+chunk_fetch_seconds = Histogram("stream_chunk_fetch_seconds", "Time to fetch one chunk from Telegram in ByteStreamer.yield_file.")
+search_seconds = Histogram("search_seconds", "Time spent in get_search_results, cache hits included.")
+db_commands = Counter("db_commands_total", "MongoDB commands sent, per command and collection.")
+floodwait_sleeps = Counter("floodwait_sleeps_total", "FloodWait errors slept through.")
+floodwait_seconds = Counter("floodwait_seconds_total", "Seconds spent sleeping on FloodWait.")
+loop_lag_seconds = Histogram("event_loop_lag_seconds", "How late the event loop woke up a 1 second sleep.", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+
+class DbCommandListener(monitoring.CommandListener):
+    """Counts every command of every Mongo client created after this module is imported."""
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        elif collection.lstrip("-").isdigit():
+            # Manual filters keep one collection per group, keep the label count bounded
+            collection = "filters"
+        db_commands.inc(command=event.command_name, collection=f"{event.database_name}.{collection}")
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+monitoring.register(DbCommandListener())
+
+
+def record_floodwait(seconds: float) -> None:
+    floodwait_sleeps.inc()
+    floodwait_seconds.inc(seconds)
+
+
+async def monitor_event_loop_lag(interval: float = 1) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        loop_lag_seconds.observe(max(time.perf_counter() - start - interval, 0))
@@ -3,15 +3,27 @@ from info import *
 from Zahid.bot import ZahidBot
 from Zahid.util.human_readable import humanbytes
 from Zahid.util.file_properties import get_file_ids
+from Zahid.util.custom_dl import file_properties_cache
 from Zahid.server.exceptions import InvalidHash
 import urllib.parse
 import logging
-import aiohttp
+
+# template path -> compiled jinja2 template, read from disk once
+templates = {}
+
+
+def get_template(template_file):
+    if template_file not in templates:
+        with open(template_file) as f:
+            templates[template_file] = jinja2.Template(f.read())
+    return templates[template_file]
 
 
 async def render_page(id, secure_hash, src=None):
-    file = await ZahidBot.get_messages(int(LOG_CHANNEL), int(id))
-    file_data = await get_file_ids(ZahidBot, int(LOG_CHANNEL), int(id))
+    # Same cache key as the main client's ByteStreamer, so streams and pages share the lookup
+    file_data = await file_properties_cache.get(
+        (ZahidBot.name, int(id)), lambda: get_file_ids(ZahidBot, int(LOG_CHANNEL), int(id))
+    )
     if file_data.unique_id[:6] != secure_hash:
         logging.debug(f"link hash: {secure_hash} - {file_data.unique_id[:6]}")
         logging.debug(f"Invalid hash for message with - ID {id}")
@@ -28,12 +40,8 @@ async def render_page(id, secure_hash, src=None):
         template_file = "Zahid/template/req.html"
     else:
         template_file = "Zahid/template/dl.html"
-        async with aiohttp.ClientSession() as s:
-            async with s.get(src) as u:
-                file_size = humanbytes(int(u.headers.get("Content-Length")))
 
-    with open(template_file) as f:
-        template = jinja2.Template(f.read())
+    template = get_template(template_file)
 
     file_name = file_data.file_name.replace("_", " ")
 
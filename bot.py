@@ -9,6 +9,8 @@ logging.getLogger("pyrogram").setLevel(logging.ERROR)
 logging.getLogger("cinemagoer").setLevel(logging.ERROR)
 
 from pyrogram import Client, idle
+# Imported before any Mongo client is created so its command listener sees every client
+from Zahid.util.metrics import monitor_event_loop_lag
 from database.users_chats_db import db
 from info import *
 from utils import temp
@@ -18,6 +20,11 @@ from datetime import date, datetime
 from aiohttp import web
 from plugins import web_server
 from plugins.clone import restart_bots
+from plugins.index import resume_index_jobs
+from plugins.broadcast import resume_broadcasts
+from database.ia_filterdb import ensure_file_indexes, backfill_search_tokens
+from database.gfilters_mdb import load_gfilters
+from database.connections_mdb import load_connections
 
 from Zahid.bot import ZahidBot
 from Zahid.util.keepalive import ping_server
@@ -47,6 +54,12 @@ async def start():
             print("Tactition Imported => " + plugin_name)
     
     asyncio.create_task(ping_server())
+    await ensure_file_indexes()
+    await load_gfilters()
+    await load_connections()
+    await db.migrate_settings()
+    asyncio.create_task(backfill_search_tokens())
+    asyncio.create_task(monitor_event_loop_lag())
     b_users, b_chats = await db.get_banned()
     temp.BANNED_USERS = b_users
     temp.BANNED_CHATS = b_chats
@@ -71,6 +84,8 @@ async def start():
         await restart_bots()
         print("Restarted All Clone Bots.")
         
+    await resume_index_jobs(ZahidBot)
+    await resume_broadcasts(ZahidBot)
     app = web.AppRunner(await web_server())
     await app.setup()
     bind_address = "0.0.0.0"
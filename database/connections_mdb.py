@@ -1,6 +1,7 @@
 
 
 import pymongo
+from collections import Counter
 
 from info import OTHER_DB_URI, DATABASE_NAME
 from pyrogram import filters
@@ -13,17 +14,38 @@ mydb = myclient[DATABASE_NAME]
 mycol = mydb['CONNECTION'] 
 
 
+# user id -> active group id, and active group id -> number of users it is active for
+user_active_groups = {}
+active_groups = Counter()
+
+
+def set_active_group(user_id, group_id):
+    """Mirror a user's active_group change into the in-memory lookup."""
+    old_group = user_active_groups.pop(user_id, None)
+    if old_group is not None:
+        active_groups[old_group] -= 1
+        if active_groups[old_group] <= 0:
+            del active_groups[old_group]
+    if group_id is not None:
+        user_active_groups[user_id] = str(group_id)
+        active_groups[str(group_id)] += 1
+
+
+async def load_connections():
+    """Create the active_group index and load every active group into memory."""
+    mycol.create_index("active_group")
+    user_active_groups.clear()
+    active_groups.clear()
+    for query in mycol.find({"active_group": {"$ne": None}}, {"active_group": 1}):
+        set_active_group(query["_id"], query.get("active_group"))
+
+
 def connected_group():
     async def func(_, __, message):
-        mycol.create_index("active_group")
-        group_id = str(message.chat.id)  # Convert to string to match DB format
         # Check if any user has this group as their active group
-        return mycol.count_documents(
-            {"active_group": group_id}
-        ) > 0
+        return str(message.chat.id) in active_groups
     return filters.create(func)
 
-# Create index once during initialization (add this at the bottom of the file)
 
 async def add_connection(group_id, user_id):
     query = mycol.find_one(
@@ -48,6 +70,7 @@ async def add_connection(group_id, user_id):
     if mycol.count_documents( {"_id": user_id} ) == 0:
         try:
             mycol.insert_one(data)
+            set_active_group(user_id, group_id)
             return True
         except:
             logger.exception('Some error occurred!', exc_info=True)
@@ -61,6 +84,7 @@ async def add_connection(group_id, user_id):
                     "$set": {"active_group" : group_id}
                 }
             )
+            set_active_group(user_id, group_id)
             return True
         except:
             logger.exception('Some error occurred!', exc_info=True)
@@ -103,6 +127,8 @@ async def make_active(user_id, group_id):
         {'_id': user_id},
         {"$set": {"active_group" : group_id}}
     )
+    if update.matched_count:
+        set_active_group(user_id, group_id)
     return update.modified_count != 0
 
 
@@ -111,6 +137,7 @@ async def make_inactive(user_id):
         {'_id': user_id},
         {"$set": {"active_group" : None}}
     )
+    set_active_group(user_id, None)
     return update.modified_count != 0
 
 
@@ -135,11 +162,13 @@ async def delete_connection(user_id, group_id):
                     {'_id': user_id},
                     {"$set": {"active_group" : prvs_group_id}}
                 )
+                set_active_group(user_id, prvs_group_id)
         else:
             mycol.update_one(
                 {'_id': user_id},
                 {"$set": {"active_group" : None}}
             )
+            set_active_group(user_id, None)
         return True
     except Exception as e:
         logger.exception(f'Some error occurred! {e}', exc_info=True)
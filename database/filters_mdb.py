@@ -1,5 +1,6 @@
 
 
+import re
 import pymongo
 from info import OTHER_DB_URI, DATABASE_NAME
 from pyrogram import enums
@@ -10,6 +11,46 @@ logger.setLevel(logging.ERROR)
 myclient = pymongo.MongoClient(OTHER_DB_URI)
 mydb = myclient[DATABASE_NAME]
 
+# group id -> (compiled keyword pattern or None, {keyword: (reply_text, btn, alert, fileid)})
+filter_matchers = {}
+
+
+def build_matcher(files):
+    """Compile every keyword of a filter collection into one pattern.
+
+    The lookahead makes finditer try every position, so overlapping keywords
+    are all found and the caller can keep the longest one like the old loop did.
+    """
+    payloads = {}
+    for file in files:
+        payloads.setdefault(file['text'].lower(), (file['reply'], file['btn'], file.get('alert'), file['file']))
+    if not payloads:
+        return None, payloads
+    keywords = sorted(payloads, key=len, reverse=True)
+    pattern = re.compile(r"(?<!\w)(?=(" + "|".join(map(re.escape, keywords)) + r")(?!\w))", flags=re.IGNORECASE)
+    return pattern, payloads
+
+
+def find_longest_keyword(matcher, text):
+    """Return (keyword, reply_text, btn, alert, fileid) for the longest keyword in text, or None."""
+    pattern, payloads = matcher
+    if not pattern:
+        return None
+    keywords = [match.group(1).lower() for match in pattern.finditer(text)]
+    keywords = [keyword for keyword in keywords if keyword in payloads]
+    if not keywords:
+        return None
+    keyword = max(keywords, key=len)
+    return (keyword, *payloads[keyword])
+
+
+async def match_filter(group_id, text):
+    matcher = filter_matchers.get(str(group_id))
+    if matcher is None:
+        matcher = build_matcher(mydb[str(group_id)].find())
+        filter_matchers[str(group_id)] = matcher
+    return find_longest_keyword(matcher, text)
+
 
 
 async def add_filter(grp_id, text, reply_text, btn, file, alert):
@@ -26,6 +67,7 @@ async def add_filter(grp_id, text, reply_text, btn, file, alert):
 
     try:
         mycol.update_one({'text': str(text)},  {"$set": data}, upsert=True)
+        filter_matchers.pop(str(grp_id), None)
     except:
         logger.exception('Some error occured!', exc_info=True)
              
@@ -70,6 +112,7 @@ async def delete_filter(message, text, group_id):
     query = mycol.count_documents(myquery)
     if query == 1:
         mycol.delete_one(myquery)
+        filter_matchers.pop(str(group_id), None)
         await message.reply_text(
             f"'`{text}`'  deleted. I'll not respond to that filter anymore.",
             quote=True,
@@ -87,6 +130,7 @@ async def del_all(message, group_id, title):
     mycol = mydb[str(group_id)]
     try:
         mycol.drop()
+        filter_matchers.pop(str(group_id), None)
         await message.edit_text(f"All filters from {title} has been removed")
     except:
         await message.edit_text("Couldn't remove all filters from group!")
@@ -3,6 +3,7 @@
 
 import pymongo
 from info import OTHER_DB_URI, DATABASE_NAME
+from database.filters_mdb import build_matcher, find_longest_keyword
 from pyrogram import enums
 import logging
 logger = logging.getLogger(__name__)
@@ -11,6 +12,22 @@ logger.setLevel(logging.ERROR)
 myclient = pymongo.MongoClient(OTHER_DB_URI)
 mydb = myclient[DATABASE_NAME]
 
+# gfilters collection name -> (compiled keyword pattern or None, {keyword: payload})
+gfilter_matchers = {}
+
+
+async def load_gfilters(gfilters='gfilters'):
+    """(Re)build the process-wide matcher for a gfilters collection."""
+    matcher = build_matcher(mydb[str(gfilters)].find())
+    gfilter_matchers[str(gfilters)] = matcher
+    return matcher
+
+
+async def match_gfilter(gfilters, text):
+    matcher = gfilter_matchers.get(str(gfilters))
+    if matcher is None:
+        matcher = await load_gfilters(gfilters)
+    return find_longest_keyword(matcher, text)
 
 
 async def add_gfilter(gfilters, text, reply_text, btn, file, alert):
@@ -27,6 +44,7 @@ async def add_gfilter(gfilters, text, reply_text, btn, file, alert):
 
     try:
         mycol.update_one({'text': str(text)},  {"$set": data}, upsert=True)
+        await load_gfilters(gfilters)
     except:
         logger.exception('Some error occured!', exc_info=True)
              
@@ -71,6 +89,7 @@ async def delete_gfilter(message, text, gfilters):
     query = mycol.count_documents(myquery)
     if query == 1:
         mycol.delete_one(myquery)
+        await load_gfilters(gfilters)
         await message.reply_text(
             f"'`{text}`'  deleted. I'll not respond to that gfilter anymore.",
             quote=True,
@@ -87,6 +106,7 @@ async def del_allg(message, gfilters):
     mycol = mydb[str(gfilters)]
     try:
         mycol.drop()
+        gfilter_matchers[str(gfilters)] = (None, {})
         await message.edit_text(f"All gfilters has been removed !")
     except:
         await message.edit_text("Couldn't remove all gfilters !")
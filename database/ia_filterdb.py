@@ -1,27 +1,88 @@
 
 
-import re, base64, json
+import re, base64, json, logging, time, asyncio, unicodedata
+from collections import OrderedDict
 from struct import pack
 from pyrogram.file_id import FileId
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
-from info import FILE_DB_URI, SEC_FILE_DB_URI, DATABASE_NAME, COLLECTION_NAME, MULTIPLE_DATABASE, USE_CAPTION_FILTER, MAX_B_TN
+import motor.motor_asyncio
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from info import FILE_DB_URIS, DATABASE_NAME, COLLECTION_NAME, MULTIPLE_DATABASE, USE_CAPTION_FILTER, MAX_B_TN, FILE_DB_POOL_SIZE, SEARCH_CACHE_TIME, SEARCH_CACHE_SIZE, SEARCH_COUNT_LIMIT
 from googlesearch import search
 import aiohttp
 from bs4 import BeautifulSoup
 from fuzzywuzzy import *
 from urllib.parse import *
+from Zahid.util.metrics import search_seconds
 
 
+# All Databases For File Saving, Files Go To The First One That Has Space
+file_clients = [motor.motor_asyncio.AsyncIOMotorClient(uri, maxPoolSize=FILE_DB_POOL_SIZE) for uri in FILE_DB_URIS]
+file_dbs = [file_client[DATABASE_NAME] for file_client in file_clients]
+file_cols = [file_db[COLLECTION_NAME] for file_db in file_dbs]
+
 # First Database For File Saving 
-client = MongoClient(FILE_DB_URI)
-db = client[DATABASE_NAME]
-col = db[COLLECTION_NAME]
+client = file_clients[0]
+db = file_dbs[0]
+col = file_cols[0]
 
 # Second Database For File Saving
-sec_client = MongoClient(SEC_FILE_DB_URI)
-sec_db = sec_client[DATABASE_NAME]
-sec_col = sec_db[COLLECTION_NAME]
+sec_client = file_clients[1] if len(file_clients) > 1 else client
+sec_db = file_dbs[1] if len(file_dbs) > 1 else db
+sec_col = file_cols[1] if len(file_cols) > 1 else col
+
+logger = logging.getLogger(__name__)
+
+# Bump when get_search_tokens changes so backfill_search_tokens re-tokenizes saved files
+SEARCH_TOKENS_VERSION = 2
+# Full names of the file collections whose tokens are known to be complete
+tokenized_cols = set()
+
+
+class SearchCache:
+    """Bounded LRU cache of search data whose entries expire after SEARCH_CACHE_TIME."""
+
+    def __init__(self, max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TIME):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value, query tokens, filter)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.time():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value, query, filter):
+        self.entries[key] = (time.time() + self.ttl, value, set(get_search_tokens(query)), filter)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, file_name=None):
+        """Drop entries whose search file_name matches, or everything when it is None."""
+        if file_name is None:
+            self.entries.clear()
+            return
+        file_tokens = set(get_search_tokens(file_name))
+        file_name = clean_file_name(file_name)
+        for key, (_, _, query_tokens, filter) in list(self.entries.items()):
+            if file_matches_search(file_name, file_tokens, query_tokens, filter):
+                del self.entries[key]
+
+
+# normalized query -> (filter, total_results)
+count_cache = SearchCache()
+# (normalized query, offset, max_results) -> (files, next_offset, total_results)
+result_cache = SearchCache()
 
 
 async def save_file(media):
@@ -34,30 +95,81 @@ async def save_file(media):
         'file_id': file_id,
         'file_name': file_name,
         'file_size': media.file_size,
-        'caption': media.caption.html if media.caption else None
+        'caption': media.caption.html if media.caption else None,
+        'tokens': get_search_tokens(file_name)
     }
 
-    if is_file_already_saved(file_id, file_name):
+    if await is_file_already_saved(file_id, file_name):
         return False, 0
 
-    try:
-        col.insert_one(file)
-        print(f"{file_name} is successfully saved.")
-        return True, 1
-    except DuplicateKeyError:
-        print(f"{file_name} is already saved.")
-        return False, 0
-    except:
-        if MULTIPLE_DATABASE:
-            try:
-                sec_col.insert_one(file)
-                print(f"{file_name} is successfully saved.")
-                return True, 1
-            except DuplicateKeyError:
-                print(f"{file_name} is already saved.")
-                return False, 0
-        else:
-            print("Your Current File Database Is Full, Turn On Multiple Database Feature And Add Second File Mongodb To Save File.")
+    for collection in file_cols:
+        try:
+            await collection.insert_one(file)
+            invalidate_search_cache(file_name)
+            print(f"{file_name} is successfully saved.")
+            return True, 1
+        except DuplicateKeyError:
+            print(f"{file_name} is already saved.")
+            return False, 0
+        except:
+            continue
+    if MULTIPLE_DATABASE:
+        print("All Your File Databases Are Full, Add Another File Mongodb In MORE_FILE_DB_URIS To Save File.")
+    else:
+        print("Your Current File Database Is Full, Turn On Multiple Database Feature And Add Second File Mongodb To Save File.")
+    return False, 2
+
+async def save_files(medias):
+    """Save a batch of files in the database and return (saved, duplicates, errors)."""
+    docs = []
+    file_ids = set()
+    file_names = set()
+    duplicates = 0
+    for media in medias:
+        file_id = unpack_new_file_id(media.file_id)
+        file_name = clean_file_name(media.file_name)
+        if file_id in file_ids or file_name in file_names:
+            duplicates += 1
+            continue
+        file_ids.add(file_id)
+        file_names.add(file_name)
+        docs.append({
+            'file_id': file_id,
+            'file_name': file_name,
+            'file_size': media.file_size,
+            'caption': media.caption.html if media.caption else None,
+            'tokens': get_search_tokens(file_name)
+        })
+    if not docs:
+        return 0, duplicates, 0
+
+    found = {'$or': [{'file_id': {'$in': list(file_ids)}}, {'file_name': {'$in': list(file_names)}}]}
+    results = await gather_file_dbs(lambda collection: collection.find(found, {'file_id': 1, 'file_name': 1}).to_list(length=None))
+    saved_ids = {file['file_id'] for result in results for file in result}
+    saved_names = {file['file_name'] for result in results for file in result}
+    new_docs = [doc for doc in docs if doc['file_id'] not in saved_ids and doc['file_name'] not in saved_names]
+    duplicates += len(docs) - len(new_docs)
+
+    saved = 0
+    for collection in file_cols:
+        if not new_docs:
+            break
+        try:
+            await collection.insert_many(new_docs, ordered=False)
+            saved += len(new_docs)
+            new_docs = []
+        except BulkWriteError as e:
+            # Duplicates are final, anything else (usually a full database) moves on to the next one.
+            failed = {error['index'] for error in e.details['writeErrors']}
+            duplicate = {error['index'] for error in e.details['writeErrors'] if error['code'] == 11000}
+            saved += e.details['nInserted']
+            duplicates += len(duplicate)
+            new_docs = [doc for index, doc in enumerate(new_docs) if index in failed - duplicate]
+        except:
+            continue
+    if saved:
+        invalidate_search_cache()
+    return saved, duplicates, len(new_docs)
 
 def clean_file_name(file_name):
     """Clean and format the file name."""
@@ -69,22 +181,92 @@ def clean_file_name(file_name):
         
     return ' '.join(filter(lambda x: not x.startswith('@') and not x.startswith('http') and not x.startswith('www.') and not x.startswith('t.me'), file_name.split()))
 
-def is_file_already_saved(file_id, file_name):
-    """Check if the file is already saved in either collection."""
-    found1 = {'file_name': file_name}
-    found = {'file_id': file_id}
+def get_search_tokens(text):
+    """Split a file name or query into the normalized words stored in the search index."""
+    # \w does not match combining marks, which would split Indic words into single letters
+    text = ''.join(char if char.isalnum() or unicodedata.category(char).startswith('M') else ' ' for char in clean_file_name(text).lower())
+    return list(dict.fromkeys(text.split()))
 
-    for collection in [col, sec_col]:
-        if collection.find_one(found1) or collection.find_one(found):
-            print(f"{file_name} is already saved.")
-            return True
+async def ensure_file_indexes():
+    """Create the search token index and the duplicate check indexes on every file collection."""
+    for collection in file_cols:
+        try:
+            await collection.create_index('tokens')
+            await collection.create_index('file_id')
+            await collection.create_index('file_name')
+        except Exception as e:
+            # A full or unreachable database must not stop the bot from starting
+            logger.exception(f"Could not create file indexes in {collection.database.name}: {e}")
+
+async def backfill_search_tokens(batch_size=1000):
+    """Add search tokens to files saved before the token index existed, and
+    re-tokenize every file once when SEARCH_TOKENS_VERSION changes."""
+    for collection in file_cols:
+        try:
+            await backfill_collection_tokens(collection, batch_size)
+        except Exception as e:
+            logger.exception(f"Could not backfill search tokens in {collection.database.name}: {e}")
+
+async def backfill_collection_tokens(collection, batch_size):
+    meta = collection.database['search_meta']
+    marker = await meta.find_one({'_id': 'tokens'})
+    retokenize = not marker or marker.get('version') != SEARCH_TOKENS_VERSION
+    found = {} if retokenize else {'tokens': {'$exists': False}}
+    updated = 0
+    requests = []
+    async for file in collection.find(found, {'file_name': 1, 'tokens': 1}):
+        tokens = get_search_tokens(file.get('file_name'))
+        if tokens == file.get('tokens'):
+            continue
+        requests.append(UpdateOne({'_id': file['_id']}, {'$set': {'tokens': tokens}}))
+        if len(requests) >= batch_size:
+            await collection.bulk_write(requests, ordered=False)
+            updated += len(requests)
+            requests = []
+    if requests:
+        await collection.bulk_write(requests, ordered=False)
+        updated += len(requests)
+    if retokenize:
+        await meta.update_one({'_id': 'tokens'}, {'$set': {'version': SEARCH_TOKENS_VERSION}}, upsert=True)
+    tokenized_cols.add(collection.full_name)
+    if updated or len(tokenized_cols) == len(file_cols):
+        # Cached searches may have used the regex fallback or missed files that now have tokens
+        invalidate_search_cache()
+    if updated:
+        logger.info(f"Updated search tokens of {updated} files in {collection.database.name}.")
+
+async def gather_file_dbs(func):
+    """Run func(collection) on every file database at once and return the results in order."""
+    return await asyncio.gather(*(func(collection) for collection in file_cols))
+
+async def get_file_db_stats():
+    """Return (files, used MB) for every file database."""
+    counts, stats = await asyncio.gather(
+        gather_file_dbs(lambda collection: collection.count_documents({})),
+        asyncio.gather(*(file_db.command('dbStats') for file_db in file_dbs))
+    )
+    return [(count, (stat['dataSize'] + stat['indexSize']) / (1024 * 1024)) for count, stat in zip(counts, stats)]
+
+async def is_file_already_saved(file_id, file_name):
+    """Check if the file is already saved in any collection."""
+    found = {'$or': [{'file_name': file_name}, {'file_id': file_id}]}
+
+    if any(await gather_file_dbs(lambda collection: collection.find_one(found, {'_id': 1}))):
+        print(f"{file_name} is already saved.")
+        return True
             
     return False
 
-async def get_search_results(chat_id, query, file_type=None, max_results=10, offset=0, filter=False):
-    """For given query return (results, next_offset)"""
-    
-    query = query.strip()
+async def delete_files(filter, many=False):
+    """Delete matching files from every file database and return how many were removed."""
+    async def delete(collection):
+        result = await (collection.delete_many(filter) if many else collection.delete_one(filter))
+        return result.deleted_count
+
+    return sum(await gather_file_dbs(delete))
+
+def get_regex_filter(query):
+    """Build the legacy file_name regex filter for a query."""
     if not query:
         raw_pattern = '.'
     elif ' ' not in query:
@@ -95,25 +277,147 @@ async def get_search_results(chat_id, query, file_type=None, max_results=10, off
         regex = re.compile(raw_pattern, flags=re.IGNORECASE)
     except:
         regex = query
-    filter = {'file_name': regex}
-    files = []
-    if MULTIPLE_DATABASE:
-        cursor1 = col.find(filter).sort('$natural', -1).skip(offset).limit(max_results)
-        cursor2 = sec_col.find(filter).sort('$natural', -1).skip(offset).limit(max_results)
-        
-        for file in cursor1:
-            files.append(file)
-        for file in cursor2:
-            files.append(file)
+    return {'file_name': regex}
+
+async def count_files(filter):
+    if SEARCH_COUNT_LIMIT:
+        options = {'limit': SEARCH_COUNT_LIMIT}
     else:
-        cursor = col.find(filter).sort('$natural', -1).skip(offset).limit(max_results)
-        
-        for file in cursor:
+        options = {}
+    return sum(await gather_file_dbs(lambda collection: collection.count_documents(filter, **options)))
+
+def normalize_query(query):
+    return ' '.join(str(query).lower().split())
+
+def file_matches_search(file_name, file_tokens, query_tokens, filter):
+    """Check whether a saved or deleted file could change the results of a cached search.
+    file_name is the cleaned name and both token arguments are sets, so they are built once per invalidation."""
+    if query_tokens <= file_tokens:
+        return True
+    if 'tokens' in filter:
+        return False
+    regex = filter['file_name'] if 'file_name' in filter else filter['$or'][1]['file_name']
+    if isinstance(regex, str):
+        return regex.lower() in file_name.lower()
+    return bool(regex.search(file_name))
+
+def invalidate_search_cache(file_name=None):
+    """Drop cached searches that file_name matches, or every cached search when it is None."""
+    count_cache.invalidate(file_name)
+    result_cache.invalidate(file_name)
+
+def get_search_cache_stats():
+    return {
+        'count_hits': count_cache.hits,
+        'count_misses': count_cache.misses,
+        'result_hits': result_cache.hits,
+        'result_misses': result_cache.misses,
+        'cached_searches': len(result_cache.entries)
+    }
+
+async def get_search_filter(query):
+    """Pick the cheapest filter for a query and return (filter, total_results).
+
+    Queries are answered from the indexed `tokens` field; the unanchored
+    file_name regex is only used when the token lookup finds nothing, which
+    covers partial words, or alongside it until backfill_search_tokens has
+    finished on every database. The choice and its count are cached so page
+    turns skip the count queries.
+    """
+    key = normalize_query(query)
+    cached = count_cache.get(key)
+    if cached:
+        return cached
+
+    filter, total_results = None, 0
+    tokens = get_search_tokens(query)
+    if tokens:
+        filter = {'tokens': {'$all': tokens}}
+        if len(tokenized_cols) < len(file_cols):
+            # Until every database is backfilled, older files can only be found by the regex
+            filter = {'$or': [filter, get_regex_filter(query)]}
+        total_results = await count_files(filter)
+    if not total_results:
+        filter = get_regex_filter(query)
+        total_results = await count_files(filter)
+
+    count_cache.set(key, (filter, total_results), key, filter)
+    return filter, total_results
+
+def encode_offset(position, last_id, before=False):
+    """Pack a result position and the _id a page starts after into a short cursor for callback data."""
+    return f"{position}{':' if before else '.'}{base64.b64encode(last_id.binary).decode()}"
+
+def decode_offset(offset):
+    """Return (position, last_id, before) for a keyset cursor or an old integer offset."""
+    offset = str(offset or 0)
+    for sep, before in (('.', False), (':', True)):
+        if sep in offset:
+            position, last_id = offset.split(sep, 1)
+            try:
+                return int(position), ObjectId(base64.b64decode(last_id)), before
+            except:
+                return 0, None, False
+    try:
+        return int(offset), None, False
+    except ValueError:
+        return 0, None, False
+
+def get_offset_position(offset):
+    """Return the result position (for page numbers) of an offset or cursor."""
+    return decode_offset(offset)[0]
+
+def get_back_offset(offset, files, max_results=10):
+    """Return the cursor for the page before the page that starts at offset."""
+    position = max(get_offset_position(offset) - max_results, 0)
+    if not position or not files:
+        return position
+    return encode_offset(position, files[0]['_id'], before=True)
+
+@search_seconds.time
+async def get_search_results(chat_id, query, file_type=None, max_results=10, offset=0, filter=False):
+    """For given query return (results, next_offset)"""
+    
+    query = query.strip()
+    cache_key = (normalize_query(query), str(offset or 0), max_results)
+    cached = result_cache.get(cache_key)
+    if cached:
+        return cached
+    filter, total_results = await get_search_filter(query)
+    position, last_id, before = decode_offset(offset)
+    if last_id:
+        filter = {**filter, '_id': {'$gt' if before else '$lt': last_id}}
+    # Each database returns its own first page (or everything up to an old
+    # integer offset); merging them in _id order keeps paging exact across databases.
+    limit = max_results if last_id else position + max_results
+
+    async def find_page(collection):
+        cursor = collection.find(filter).sort('_id', 1 if before else -1)
+        if len(file_cols) == 1 and not last_id:
+            return await cursor.skip(position).limit(max_results).to_list(length=max_results)
+        return await cursor.limit(limit).to_list(length=limit)
+
+    pages = await gather_file_dbs(find_page)
+    files = []
+    seen = set()
+    for file in sorted((file for page in pages for file in page), key=lambda file: file['_id'], reverse=not before):
+        if file['file_id'] not in seen:
+            seen.add(file['file_id'])
             files.append(file)
+    if len(file_cols) > 1 and not last_id:
+        files = files[position:]
+    files = files[:max_results]
+    if before:
+        files.reverse()
 
-    total_results = col.count_documents(filter) if not MULTIPLE_DATABASE else (col.count_documents(filter) + sec_col.count_documents(filter))
-    next_offset = "" if (offset + max_results) >= total_results else (offset + max_results)
+    # A capped count is only a lower bound, so keep paging while pages come back full.
+    more_results = (position + max_results) < total_results or (SEARCH_COUNT_LIMIT and total_results >= SEARCH_COUNT_LIMIT and len(files) == max_results)
+    if not files or not more_results:
+        next_offset = ""
+    else:
+        next_offset = encode_offset(position + max_results, files[-1]['_id'])
 
+    result_cache.set(cache_key, (files, next_offset, total_results), cache_key[0], filter)
     return files, next_offset, total_results
 
 async def get_bad_files(query, file_type=None, use_filter=False):
@@ -136,20 +440,18 @@ async def get_bad_files(query, file_type=None, use_filter=False):
     if USE_CAPTION_FILTER:
         filter_criteria = {'$or': [filter_criteria, {'caption': regex}]}
 
-    def count_documents(collection):
-        return collection.count_documents(filter_criteria)
-
-    total_results = (count_documents(col) + count_documents(sec_col) if MULTIPLE_DATABASE else count_documents(col))
-
-    def find_documents(collection):
-        return list(collection.find(filter_criteria))
-
-    files = (find_documents(col) + find_documents(sec_col) if MULTIPLE_DATABASE else find_documents(col))
+    counts, results = await asyncio.gather(
+        gather_file_dbs(lambda collection: collection.count_documents(filter_criteria)),
+        gather_file_dbs(lambda collection: collection.find(filter_criteria).to_list(length=None))
+    )
+    total_results = sum(counts)
+    files = [file for result in results for file in result]
 
     return files, total_results
 
 async def get_file_details(query):
-    return col.find_one({'file_id': query}) or sec_col.find_one({'file_id': query})
+    files = await gather_file_dbs(lambda collection: collection.find_one({'file_id': query}))
+    return next((file for file in files if file), None)
 
 def encode_file_id(s: bytes) -> str:
     r = b""
@@ -4,7 +4,7 @@ import re
 import logging
 from pymongo.errors import DuplicateKeyError
 import motor.motor_asyncio
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from info import DATABASE_NAME, USER_DB_URI, OTHER_DB_URI, CUSTOM_FILE_CAPTION, IMDB, IMDB_TEMPLATE, MELCOW_NEW_USERS, BUTTON_MODE, SPELL_CHECK_REPLY, PROTECT_CONTENT, AUTO_DELETE, MAX_BTN, AUTO_FFILTER, SHORTLINK_API, SHORTLINK_URL, SHORTLINK_MODE, TUTORIAL, IS_TUTORIAL
 import time
 import datetime
@@ -67,6 +67,9 @@ class Database:
         self.grp = self.db.groups
         self.users = self.db.uersz
         self.bot = self.db.clone_bots
+        self.index_jobs = self.db.index_jobs
+        self.broadcasts = self.db.broadcasts
+        self.migrations = self.db.migrations
         self.db.file_titles.create_index("title", unique=True)  # Add this line
 
 
@@ -175,6 +178,18 @@ class Database:
     async def delete_user(self, user_id):
         await self.col.delete_many({'id': int(user_id)})
 
+    async def delete_users(self, user_ids):
+        if user_ids:
+            await self.col.delete_many({'id': {'$in': [int(user_id) for user_id in user_ids]}})
+
+    async def add_unreachable_bots(self, user_bots):
+        """Record helper bots that could not message a user, user_bots maps user id -> bot ids."""
+        if user_bots:
+            await self.col.bulk_write([
+                UpdateOne({'id': int(user_id)}, {'$addToSet': {'unreachable_bots': {'$each': bot_ids}}})
+                for user_id, bot_ids in user_bots.items()
+            ], ordered=False)
+
 
     async def get_banned(self):
         users = self.col.find({'ban_status.is_banned': True})
@@ -206,11 +221,27 @@ class Database:
         await self.grp.update_one({'id': int(id)}, {'$set': {'settings': settings}})
         
     
+    async def update_setting(self, id, key, value):
+        await self.grp.update_one({'id': int(id)}, {'$set': {f'settings.{key}': value}})
+    
+    
+    async def migrate_settings(self):
+        """Backfill settings keys that were added after a group was saved.
+        Each default key is backfilled once, the keys already done are recorded in migrations."""
+        marker = await self.migrations.find_one({'_id': 'settings'}) or {}
+        done = set(marker.get('keys', []))
+        for key, value in default_setgs.items():
+            if key in done:
+                continue
+            await self.grp.update_many({f'settings.{key}': {'$exists': False}}, {'$set': {f'settings.{key}': value}})
+            await self.migrations.update_one({'_id': 'settings'}, {'$addToSet': {'keys': key}}, upsert=True)
+    
+    
     async def get_settings(self, id):
         chat = await self.grp.find_one({'id':int(id)})
         if chat:
-            return chat.get('settings', default_setgs)
-        return default_setgs
+            return {**default_setgs, **(chat.get('settings') or {})}
+        return dict(default_setgs)
     
 
     async def disable_chat(self, chat, reason="No Reason"):
@@ -230,6 +261,72 @@ class Database:
         return self.grp.find({})
 
 
+    def new_index_job(self, chat, last_msg_id, skip, status_chat, status_msg):
+        return dict(
+            chat = chat,
+            last_msg_id = last_msg_id,
+            current = skip,
+            status_chat = status_chat,
+            status_msg = status_msg,
+            total_files = 0,
+            duplicate = 0,
+            deleted = 0,
+            no_media = 0,
+            unsupported = 0,
+            errors = 0,
+        )
+
+    async def add_index_job(self, chat, last_msg_id, skip, status_chat, status_msg):
+        job = self.new_index_job(chat, last_msg_id, skip, status_chat, status_msg)
+        await self.index_jobs.insert_one(job)
+        return job
+
+    async def update_index_job(self, job_id, data):
+        await self.index_jobs.update_one({'_id': job_id}, {'$set': data})
+
+    async def delete_index_job(self, job_id):
+        await self.index_jobs.delete_one({'_id': job_id})
+
+    async def get_index_job(self, job_id):
+        return await self.index_jobs.find_one({'_id': job_id})
+
+    async def get_index_jobs(self):
+        return await self.index_jobs.find({}).sort('_id', 1).to_list(length=None)
+
+
+    def new_broadcast(self, kind, from_chat, msg_id, status_chat, status_msg, dry_run=False):
+        return dict(
+            kind = kind,
+            dry_run = dry_run,
+            from_chat = from_chat,
+            msg_id = msg_id,
+            status_chat = status_chat,
+            status_msg = status_msg,
+            last_id = None,
+            stats = dict(done=0, success=0, blocked=0, deleted=0, failed=0),
+            started = time.time(),
+        )
+
+    async def add_broadcast(self, kind, from_chat, msg_id, status_chat, status_msg, dry_run=False):
+        job = self.new_broadcast(kind, from_chat, msg_id, status_chat, status_msg, dry_run)
+        await self.broadcasts.insert_one(job)
+        return job
+
+    async def update_broadcast(self, job_id, data):
+        await self.broadcasts.update_one({'_id': job_id}, {'$set': data})
+
+    async def delete_broadcast(self, job_id):
+        await self.broadcasts.delete_one({'_id': job_id})
+
+    async def get_broadcasts(self):
+        return await self.broadcasts.find({}).sort('_id', 1).to_list(length=None)
+
+    async def get_broadcast_batch(self, kind, last_id, limit):
+        col = self.grp if kind == 'groups' else self.col
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        return await col.find(query, {'id': 1, 'unreachable_bots': 1}).sort('_id', 1).to_list(length=limit)
+
+
     async def get_db_size(self):
         return (await self.db.command("dbstats"))['dataSize']
 
@@ -69,11 +69,13 @@ DATABASE_NAME = environ.get('DATABASE_NAME', "Cluster0")
 COLLECTION_NAME = environ.get('COLLECTION_NAME', 'WisionXCollections')
 
 MULTIPLE_DATABASE = bool(environ.get('MULTIPLE_DATABASE', False)) # Set True or False
+FILE_DB_POOL_SIZE = int(environ.get('FILE_DB_POOL_SIZE', '100')) # Max Connections Per File Database Client, Raise It For Busy Bots.
 
 # If Multiple Database Is True Then Fill All Three Below Database Uri Else You Will Get Error.
 O_DB_URI = environ.get('O_DB_URI', "")   # This Db Is For Other Data Store
 F_DB_URI = environ.get('F_DB_URI', "")   # This Db Is For File Data Store
 S_DB_URI = environ.get('S_DB_URI', "")   # This Db is for File Data Store When First Db Is Going To Be Full.
+MORE_FILE_DB_URIS = environ.get('MORE_FILE_DB_URIS', '').split()   # Extra File Data Store Dbs Used After Second Db Is Full, Separate Multiple Uri By Space.
 
 
 # Premium And Referal Settings
@@ -141,7 +143,17 @@ TUTORIAL = environ.get('TUTORIAL', '') # How Open Shortner Link Video Link , Cha
 
 # Others
 CACHE_TIME = int(environ.get('CACHE_TIME', 1800))
+SEARCH_CACHE_TIME = int(environ.get('SEARCH_CACHE_TIME', 600)) # Seconds A Search Result Count Is Reused For Page Turns.
+SEARCH_CACHE_SIZE = int(environ.get('SEARCH_CACHE_SIZE', 5000)) # Max Number Of Cached Searches.
+SEARCH_COUNT_LIMIT = int(environ.get('SEARCH_COUNT_LIMIT', 0)) # Stop Counting Results After This Many (0 = Exact Count), Pages Beyond It Still Work.
+SETTINGS_CACHE_TIME = int(environ.get('SETTINGS_CACHE_TIME', 300)) # Seconds Group Settings Are Reused Before Reading Them Again.
+SETTINGS_CACHE_SIZE = int(environ.get('SETTINGS_CACHE_SIZE', 10000)) # Max Number Of Groups Kept In The Settings Cache.
 MAX_B_TN = environ.get("MAX_B_TN", "5")
+INDEX_BATCH_SIZE = int(environ.get("INDEX_BATCH_SIZE", "200")) # Files Saved Per Database Write While Indexing.
+BROADCAST_WORKERS = int(environ.get("BROADCAST_WORKERS", "20")) # Messages Sent At The Same Time While Broadcasting.
+BROADCAST_RATE = int(environ.get("BROADCAST_RATE", "25")) # Max Broadcast Messages Per Second, Telegram Allows About 30.
+BROADCAST_BATCH_SIZE = int(environ.get("BROADCAST_BATCH_SIZE", "500")) # Recipients Read And Checkpointed Per Batch.
+BROADCAST_MULTI_CLIENT = bool(environ.get('BROADCAST_MULTI_CLIENT', False)) # Set True To Share User Broadcasts With MULTI_TOKEN Clients, Only Useful If Your Users Started Those Bots Too.
 PORT = environ.get("PORT", "8080")
 MSG_ALRT = environ.get('MSG_ALRT', 'Keep Growing Mate,World Is Yours')
 CUSTOM_FILE_CAPTION = environ.get("CUSTOM_FILE_CAPTION", f"{script.CAPTION}")
@@ -165,10 +177,24 @@ STREAM_MODE = bool(environ.get('STREAM_MODE', True)) # Set True or False
 MULTI_CLIENT = False
 SLEEP_THRESHOLD = int(environ.get('SLEEP_THRESHOLD', '40'))
 PING_INTERVAL = int(environ.get("PING_INTERVAL", "100"))  # 20 minutes
+STREAM_PREFETCH = int(environ.get("STREAM_PREFETCH", "4")) # Chunks Requested Ahead From Telegram Per Stream, Each Uses 1 MiB Of Memory.
+STREAM_CACHE_DIR = environ.get("STREAM_CACHE_DIR", "") # Folder To Keep Streamed Chunks In, Leave Empty To Disable The Disk Cache.
+STREAM_CACHE_SIZE = int(environ.get("STREAM_CACHE_SIZE", "2048")) # Max Disk Space For Cached Chunks In MB.
+FILE_PROPERTIES_CACHE_SIZE = int(environ.get("FILE_PROPERTIES_CACHE_SIZE", "2000")) # Max Number Of Streamed Files Whose Telegram File Info Is Kept In Memory.
+FILE_PROPERTIES_CACHE_TIME = int(environ.get("FILE_PROPERTIES_CACHE_TIME", "1800")) # Seconds Before A Streamed File's Info Is Fetched Again.
+STREAM_WARM_DCS = [int(dc) for dc in environ.get("STREAM_WARM_DCS", "1 2 4 5").split()] # Telegram DCs Every Client Opens A Media Session To At Startup.
+STREAM_CACHE_CONTROL = dict(
+    (mime.strip(), value.strip()) for mime, _, value in (rule.partition("=") for rule in environ.get("STREAM_CACHE_CONTROL", "video/*=public, max-age=604800|audio/*=public, max-age=604800|*=public, max-age=86400").split("|")) if value
+) # Cache-Control Header Per Mime Type For Streamed Files, Rules Like "video/*=public, max-age=604800" Separated By |.
+STREAM_MAX_PER_IP = int(environ.get("STREAM_MAX_PER_IP", "0")) # Streams One IP Can Have Open At Once, 0 For No Limit.
+STREAM_RATE_PER_CONNECTION = int(environ.get("STREAM_RATE_PER_CONNECTION", "0")) # Max KB/s For One Stream, 0 For No Limit.
+STREAM_RATE_PER_FILE = int(environ.get("STREAM_RATE_PER_FILE", "0")) # Max KB/s Shared By All Streams Of One File, 0 For No Limit.
+STREAM_MAX_INFLIGHT_MB = int(environ.get("STREAM_MAX_INFLIGHT_MB", "0")) # Max MB All Open Streams May Still Have To Send, 0 For No Limit.
 if 'DYNO' in environ:
     ON_HEROKU = True
 else:
     ON_HEROKU = False
+STREAM_TRUST_PROXY = bool(environ.get('STREAM_TRUST_PROXY', ON_HEROKU)) # Set True Behind A Reverse Proxy To Limit By X-Forwarded-For, On By Default On Heroku.
 URL = environ.get("URL", "")
 
 
@@ -189,8 +215,10 @@ if MULTIPLE_DATABASE == False:
     OTHER_DB_URI = DATABASE_URI
     FILE_DB_URI = DATABASE_URI
     SEC_FILE_DB_URI = DATABASE_URI
+    FILE_DB_URIS = [FILE_DB_URI]
 else:
     USER_DB_URI = DATABASE_URI    # This Db is for User Data Store
     OTHER_DB_URI = O_DB_URI       # This Db Is For Other Data Store
     FILE_DB_URI = F_DB_URI        # This Db Is For File Data Store
     SEC_FILE_DB_URI = S_DB_URI    # This Db is for File Data Store When First Db Is Going To Be Full.
+    FILE_DB_URIS = [FILE_DB_URI, SEC_FILE_DB_URI] + MORE_FILE_DB_URIS    # All File Data Store Dbs, Searched Together.
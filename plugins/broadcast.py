@@ -1,75 +1,176 @@
-
-
-import datetime, time, asyncio
+import datetime, time, asyncio, logging
 from pyrogram import Client, filters
 from database.users_chats_db import db
-from info import ADMINS
-from utils import broadcast_messages, broadcast_messages_group
-        
+from info import ADMINS, LOG_CHANNEL, BROADCAST_WORKERS, BROADCAST_RATE, BROADCAST_BATCH_SIZE, BROADCAST_MULTI_CLIENT
+from utils import broadcast_messages, broadcast_messages_group, DEAD_USER_STATUSES, can_resend
+from Zahid.util.rate_limit import TokenBucket
+from Zahid.bot import multi_clients
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+# One send budget per bot client, shared by every running broadcast so each bot stays under its own limit
+limiters = {}
+
+
+def get_limiter(index):
+    if index not in limiters:
+        limiters[index] = TokenBucket(BROADCAST_RATE)
+    return limiters[index]
+
+
 @Client.on_message(filters.command("broadcast") & filters.user(ADMINS))
 async def pm_broadcast(bot, message):
+    # `/broadcast dry` sends as usual but only reports dead users instead of deleting them
+    dry_run = 'dry' in message.command[1:]
     b_msg = await bot.ask(chat_id = message.from_user.id, text = "Now Send Me Your Broadcast Message")
     try:
-        users = await db.get_all_users()
         sts = await message.reply_text('Broadcasting your messages...')
-        start_time = time.time()
-        total_users = await db.total_users_count()
-        done = 0
-        blocked = 0
-        deleted = 0
-        failed = 0
-        success = 0
-        async for user in users:
-            if 'id' in user:
-                pti, sh = await broadcast_messages(int(user['id']), b_msg)
-                if pti:
-                    success += 1
-                elif pti == False:
-                    if sh == "Blocked":
-                        blocked += 1
-                    elif sh == "Deleted":
-                        deleted += 1
-                    elif sh == "Error":
-                        failed += 1
-                done += 1
-                if not done % 20:
-                    await sts.edit(f"Broadcast in progress:\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")    
-            else:
-                # Handle the case where 'id' key is missing in the user dictionary 
-                done += 1
-                failed += 1
-                if not done % 20:
-                    await sts.edit(f"Broadcast in progress:\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")    
-    
-        time_taken = datetime.timedelta(seconds=int(time.time()-start_time))
-        await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users: {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")
+        job = await db.add_broadcast('users', b_msg.chat.id, b_msg.id, sts.chat.id, sts.id, dry_run)
+        await run_broadcast(bot, job, b_msg, sts)
     except Exception as e:
         print(f"error: {e}")
 
 
-
 @Client.on_message(filters.command("grp_broadcast") & filters.user(ADMINS))
 async def broadcast_group(bot, message):
     b_msg = await bot.ask(chat_id = message.from_user.id, text = "Now Send Me Your Broadcast Message")
-    groups = await db.get_all_chats()
     sts = await message.reply_text(
         text='Broadcasting your messages To Groups...'
     )
+    job = await db.add_broadcast('groups', b_msg.chat.id, b_msg.id, sts.chat.id, sts.id)
+    await run_broadcast(bot, job, b_msg, sts)
+
+
+def get_broadcast_status(job, total, speed=None, completed=False, client_speeds=None):
+    stats = job['stats']
+    if job['kind'] == 'groups':
+        text = f"Total Groups {total}\nCompleted: {stats['done']} / {total}\nSuccess: {stats['success']}"
+    else:
+        text = f"Total Users {total}\nCompleted: {stats['done']} / {total}\nSuccess: {stats['success']}\nBlocked: {stats['blocked']}\nDeleted: {stats['deleted']}"
+        if job.get('dry_run'):
+            text += f"\nDead Users Kept (Dry Run): {stats.get('dead', 0)}"
+    if completed:
+        time_taken = datetime.timedelta(seconds=int(time.time() - job['started']))
+        return f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\n{text}"
+    text = f"Broadcast in progress:\n\n{text}\nSpeed: {speed:.1f} msg/sec"
+    if client_speeds and len(client_speeds) > 1:
+        text += "\n" + "\n".join(f"Client {index}: {client_speed:.1f} msg/sec" for index, client_speed in client_speeds.items())
+    return text
+
+
+async def get_helper_messages(bot, b_msg):
+    """Return {client index: b_msg as that helper sees it} for the helpers that can send it.
+
+    A media file_id carries the file reference of the bot that received it, so each
+    helper reads its own copy of the message from LOG_CHANNEL, like ByteStreamer does.
+    """
+    helpers = [index for index in sorted(multi_clients) if index]
+    if not helpers or not b_msg.media:
+        return {index: b_msg for index in helpers}
+    try:
+        copied = await b_msg.copy(LOG_CHANNEL)
+    except Exception as e:
+        logger.exception(e)
+        return {}
+    helper_msgs = {}
+    for index in helpers:
+        try:
+            msg = await multi_clients[index].get_messages(LOG_CHANNEL, copied.id)
+            if not msg.empty and can_resend(msg):
+                helper_msgs[index] = msg
+        except Exception as e:
+            logger.warning(f"Client {index} can not read the broadcast message, it will not send it: {e}")
+    return helper_msgs
+
+
+async def run_broadcast(bot, job, b_msg, sts):
+    """Send b_msg to every user or group in batches, checkpointing after each batch."""
+    groups = job['kind'] == 'groups'
+    send = broadcast_messages_group if groups else broadcast_messages
+    total = await (db.total_chat_count() if groups else db.total_users_count())
+    stats = job['stats']
+    workers = asyncio.Semaphore(BROADCAST_WORKERS)
     start_time = time.time()
-    total_groups = await db.total_chat_count()
-    done = 0
-    failed = 0
-
-    success = 0
-    async for group in groups:
-        pti, sh = await broadcast_messages_group(int(group['id']), b_msg)
-        if pti:
-            success += 1
-        elif sh == "Error":
-                failed += 1
-        done += 1
-        if not done % 20:
-            await sts.edit(f"Broadcast in progress:\n\nTotal Groups {total_groups}\nCompleted: {done} / {total_groups}\nSuccess: {success}")    
-    time_taken = datetime.timedelta(seconds=int(time.time()-start_time))
-    await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Groups {total_groups}\nCompleted: {done} / {total_groups}\nSuccess: {success}")
-        
+    sent = 0
+    clients = [0]
+    helper_msgs = {}
+    if BROADCAST_MULTI_CLIENT and not groups and can_resend(b_msg):
+        helper_msgs = await get_helper_messages(bot, b_msg)
+        clients = [0] + sorted(helper_msgs)
+    sent_by = {index: 0 for index in clients}
+
+    async def send_one(position, chat):
+        async with workers:
+            if 'id' not in chat:
+                # Handle the case where 'id' key is missing in the chat document
+                return False, "Error"
+            # Helper bots only reach users who started them, so each helper is tried at most once per user
+            unreachable = chat.get('unreachable_bots') or []
+            candidates = [index for index in clients if not index or multi_clients[index].me.id not in unreachable]
+            index = candidates[position % len(candidates)]
+            if index:
+                pti, sh = await send(int(chat['id']), helper_msgs[index], client=multi_clients[index], limiter=get_limiter(index))
+                if pti:
+                    sent_by[index] += 1
+                    return pti, sh
+                if sh in DEAD_USER_STATUSES:
+                    unreachable_bots.setdefault(chat['id'], []).append(multi_clients[index].me.id)
+                # The main bot retries and decides if a user is dead
+            pti, sh = await send(int(chat['id']), b_msg, limiter=get_limiter(0))
+            if pti:
+                sent_by[0] += 1
+            return pti, sh
+
+    while True:
+        batch = await db.get_broadcast_batch(job['kind'], job['last_id'], BROADCAST_BATCH_SIZE)
+        if not batch:
+            break
+        dead = []
+        unreachable_bots = {}
+        results = await asyncio.gather(*[send_one(stats['done'] + position, chat) for position, chat in enumerate(batch)])
+        for chat, (pti, sh) in zip(batch, results):
+            if not groups and sh in DEAD_USER_STATUSES:
+                dead.append(chat['id'])
+            if pti:
+                stats['success'] += 1
+            elif sh == "Blocked":
+                stats['blocked'] += 1
+            elif sh == "Deleted":
+                stats['deleted'] += 1
+            else:
+                stats['failed'] += 1
+        if job.get('dry_run'):
+            stats['dead'] = stats.get('dead', 0) + len(dead)
+        else:
+            # One delete per batch instead of one per dead user
+            await db.delete_users(dead)
+        await db.add_unreachable_bots({user_id: bots for user_id, bots in unreachable_bots.items() if user_id not in dead})
+        stats['done'] += len(batch)
+        sent += len(batch)
+        job['last_id'] = batch[-1]['_id']
+        await db.update_broadcast(job['_id'], {'last_id': job['last_id'], 'stats': stats})
+        elapsed = max(time.time() - start_time, 1)
+        try:
+            await sts.edit(get_broadcast_status(job, total, sent / elapsed, client_speeds={index: count / elapsed for index, count in sent_by.items()}))
+        except Exception:
+            pass
+    await db.delete_broadcast(job['_id'])
+    await sts.edit(get_broadcast_status(job, total, completed=True))
+
+
+async def resume_broadcasts(bot):
+    """Continue the broadcasts that were unfinished when the bot stopped."""
+    for job in await db.get_broadcasts():
+        try:
+            b_msg = await bot.get_messages(job['from_chat'], job['msg_id'])
+            if b_msg.empty:
+                raise ValueError("broadcast message was deleted")
+            sts = await bot.get_messages(job['status_chat'], job['status_msg'])
+            if sts.empty:
+                sts = await bot.send_message(job['from_chat'], "Resuming Broadcast...")
+        except Exception as e:
+            logger.exception(e)
+            await db.delete_broadcast(job['_id'])
+            continue
+        logger.info(f"Resuming {job['kind']} broadcast after {job['stats']['done']} chats.")
+        asyncio.create_task(run_broadcast(bot, job, b_msg, sts))
@@ -4,7 +4,7 @@ from Script import *
 from pyrogram import Client, filters, enums
 from pyrogram.errors import ChatAdminRequired, FloodWait, MessageTooLong
 from pyrogram.types import *
-from database.ia_filterdb import col, sec_col, get_file_details, unpack_new_file_id, get_bad_files
+from database.ia_filterdb import file_cols, delete_files, get_file_details, unpack_new_file_id, get_bad_files, invalidate_search_cache, ensure_file_indexes
 from database.users_chats_db import db, delete_all_referal_users, get_referal_users_count, get_referal_all_users, referal_add_user
 from database.join_reqs import JoinReqs
 from info import *
@@ -1017,14 +1017,11 @@ async def delete(bot, message):
     
     file_id, file_ref = unpack_new_file_id(media.file_id)
 
-    result = col.delete_one({
+    deleted = await delete_files({
         'file_id': file_id,
     })
-    if not result.deleted_count:
-        result = sec_col.delete_one({
-            'file_id': file_id,
-        })
-    if result.deleted_count:
+    if deleted:
+        invalidate_search_cache(media.file_name)
         await msg.edit('File is successfully deleted from database')
     else:
         file_name = re.sub(r"(_|\-|\.|\+)", " ", str(media.file_name))
@@ -1033,31 +1030,23 @@ async def delete(bot, message):
             file_name = file_name.replace(char, '')
         file_name = ' '.join(filter(lambda x: not x.startswith('@'), file_name.split()))
     
-        result = col.delete_many({
+        deleted = await delete_files({
             'file_name': file_name,
             'file_size': media.file_size
-        })
-        if not result.deleted_count:
-            result = sec_col.delete_many({
-                'file_name': file_name,
-                'file_size': media.file_size
-            })
-        if result.deleted_count:
+        }, many=True)
+        if deleted:
+            invalidate_search_cache(media.file_name)
             await msg.edit('File is successfully deleted from database')
         else:
             # files indexed before https://github.com/EvamariaTG/EvaMaria/commit/f3d2a1bcb155faf44178e5d7a685a1b533e714bf#diff-86b613edf1748372103e94cacff3b578b36b698ef9c16817bb98fe9ef22fb669R39 
             # have original file name.
 
-            result = col.delete_many({
+            deleted = await delete_files({
                 'file_name': media.file_name,
                 'file_size': media.file_size
-            })
-            if not result.deleted_count:
-                result = sec_col.delete_many({
-                    'file_name': media.file_name,
-                    'file_size': media.file_size
-                })
-            if result.deleted_count:
+            }, many=True)
+            if deleted:
+                invalidate_search_cache(media.file_name)
                 await msg.edit('File is successfully deleted from database')
             else:
                 await msg.edit('File not found in database')
@@ -1080,8 +1069,11 @@ async def delete_all_index(bot, message):
 
 @Client.on_callback_query(filters.regex(r'^autofilter_delete'))
 async def delete_all_index_confirm(bot, query):
-    col.drop()
-    sec_col.drop()
+    for collection in file_cols:
+        await collection.drop()
+    # Dropping a collection also drops its indexes
+    await ensure_file_indexes()
+    invalidate_search_cache()
     await query.answer('Piracy Is Crime')
     await query.message.edit('Succesfully Deleted All The Indexed Files.')
 
@@ -3,7 +3,7 @@
 import re, logging
 from pyrogram import Client, filters
 from info import DELETE_CHANNELS
-from database.ia_filterdb import col, sec_col, unpack_new_file_id
+from database.ia_filterdb import delete_files, unpack_new_file_id, invalidate_search_cache
 
 logger = logging.getLogger(__name__)
 media_filter = filters.document | filters.video
@@ -21,14 +21,11 @@ async def deletemultiplemedia(bot, message):
 
     file_id, file_ref = unpack_new_file_id(media.file_id)
 
-    result = col.delete_one({
+    deleted = await delete_files({
         'file_id': file_id,
     })
-    if not result.deleted_count:
-        result = sec_col.delete_one({
-            'file_id': file_id,
-        })
-    if result.deleted_count:
+    if deleted:
+        invalidate_search_cache(media.file_name)
         logger.info('File is successfully deleted from database.')
     else:
         file_name = re.sub(r"(_|\-|\.|\+)", " ", str(media.file_name))
@@ -37,28 +34,20 @@ async def deletemultiplemedia(bot, message):
             file_name = file_name.replace(char, '')
         file_name = ' '.join(filter(lambda x: not x.startswith('@'), file_name.split()))
     
-        result = col.delete_many({
+        deleted = await delete_files({
             'file_name': file_name,
             'file_size': media.file_size
-        })
-        if not result.deleted_count:
-            result = sec_col.delete_many({
-                'file_name': file_name,
-                'file_size': media.file_size
-            })
-        if result.deleted_count:
+        }, many=True)
+        if deleted:
+            invalidate_search_cache(media.file_name)
             logger.info('File is successfully deleted from database.')
         else:
-            result = col.delete_many({
+            deleted = await delete_files({
                 'file_name': media.file_name,
                 'file_size': media.file_size
-            })
-            if not result.deleted_count:
-                result = sec_col.delete_many({
-                    'file_name': media.file_name,
-                    'file_size': media.file_size
-                })
-            if result.deleted_count:
+            }, many=True)
+            if deleted:
+                invalidate_search_cache(media.file_name)
                 logger.info('File is successfully deleted from database.')
             else:
                 logger.info('File not found in database.')
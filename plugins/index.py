@@ -1,24 +1,47 @@
 
 
-import logging, re, asyncio
+import logging, re, asyncio, time
 from utils import temp
-from info import ADMINS
+from info import ADMINS, INDEX_BATCH_SIZE
 from pyrogram import Client, filters, enums
 from pyrogram.errors import FloodWait, MessageNotModified
 from pyrogram.errors.exceptions.bad_request_400 import ChannelInvalid, ChatAdminRequired, UsernameInvalid, UsernameNotModified
 from info import INDEX_REQ_CHANNEL as LOG_CHANNEL
-from database.ia_filterdb import save_file
+from database.ia_filterdb import save_files
+from database.users_chats_db import db
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 lock = asyncio.Lock()
+index_queue = asyncio.Queue()
+index_worker = None
+# Ids of the jobs waiting in index_queue or running, so a job is never run twice at once
+index_job_ids = set()
 
 @Client.on_callback_query(filters.regex(r'^index'))
 async def index_files(bot, query):
     if query.data.startswith('index_cancel'):
         temp.CANCEL = True
         return await query.answer("Cancelling Indexing")
+    if query.data.startswith(('index_retry', 'index_discard')):
+        if query.from_user.id not in ADMINS:
+            return await query.answer("Only admins can do this.", show_alert=True)
+        action, job_id = query.data.split("#")
+        job = await db.get_index_job(ObjectId(job_id))
+        if not job:
+            return await query.answer("This indexing job no longer exists.", show_alert=True)
+        if action == 'index_discard':
+            await db.delete_index_job(job['_id'])
+            return await query.message.edit_reply_markup(None)
+        if job['_id'] in index_job_ids:
+            return await query.answer("This indexing job is already queued.", show_alert=True)
+        await db.update_index_job(job['_id'], {'failed': None})
+        await query.answer(f"Resuming from message {job['current']}")
+        await query.message.edit_reply_markup(None)
+        await queue_index_job(job)
+        return start_index_worker(bot)
     _, raju, chat, lst_msg_id, from_user = query.data.split("#")
     if raju == 'reject':
         await query.message.delete()
@@ -29,8 +52,6 @@ async def index_files(bot, query):
         )
         return
 
-    if lock.locked():
-        return await query.answer('Wait until previous process complete.', show_alert=True)
     msg = query.message
 
     await query.answer('Processing...⏳', show_alert=True)
@@ -40,17 +61,62 @@ async def index_files(bot, query):
             f'Your Submission for indexing {chat} has been accepted by our moderators and will be added soon.',
             reply_to_message_id=int(lst_msg_id)
         )
-    await msg.edit(
-        "Starting Indexing",
-        reply_markup=InlineKeyboardMarkup(
-            [[InlineKeyboardButton('Cancel', callback_data='index_cancel')]]
-        )
-    )
     try:
         chat = int(chat)
     except:
         chat = chat
-    await index_files_to_db(int(lst_msg_id), chat, msg, bot)
+    jobs_ahead = index_queue.qsize() + (1 if lock.locked() else 0)
+    job = await db.add_index_job(chat, int(lst_msg_id), temp.CURRENT, msg.chat.id, msg.id)
+    if jobs_ahead:
+        await msg.edit(f"Queued For Indexing, {jobs_ahead} Job(s) Ahead Of This One.")
+    await queue_index_job(job)
+    start_index_worker(bot)
+
+
+async def queue_index_job(job):
+    index_job_ids.add(job['_id'])
+    await index_queue.put(job)
+
+
+def start_index_worker(bot):
+    global index_worker
+    if index_worker is None or index_worker.done():
+        index_worker = asyncio.create_task(run_index_jobs(bot))
+
+
+async def run_index_jobs(bot):
+    """Run queued indexing jobs one after another."""
+    while True:
+        job = await index_queue.get()
+        try:
+            msg = await get_index_status_message(bot, job)
+            await index_files_to_db(job, msg, bot)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            index_job_ids.discard(job['_id'])
+
+
+async def get_index_status_message(bot, job):
+    try:
+        msg = await bot.get_messages(job['status_chat'], job['status_msg'])
+        if not msg.empty:
+            return msg
+    except Exception:
+        pass
+    msg = await bot.send_message(LOG_CHANNEL, f"Resuming Indexing Of <code>{job['chat']}</code>")
+    await db.update_index_job(job['_id'], {'status_chat': msg.chat.id, 'status_msg': msg.id})
+    return msg
+
+
+async def resume_index_jobs(bot):
+    """Queue the indexing jobs that were unfinished when the bot stopped."""
+    for job in await db.get_index_jobs():
+        if job['_id'] not in index_job_ids:
+            await queue_index_job(job)
+    if not index_queue.empty():
+        logger.info(f"Resuming {index_queue.qsize()} indexing job(s).")
+        start_index_worker(bot)
 
 
 @Client.on_message(filters.private & filters.command('index'))
@@ -133,28 +199,75 @@ async def set_skip_number(bot, message):
         await message.reply("Give me a skip number")
 
 
-async def index_files_to_db(lst_msg_id, chat, msg, bot):
-    total_files = 0
-    duplicate = 0
-    errors = 0
-    deleted = 0
-    no_media = 0
-    unsupported = 0
+async def index_files_to_db(job, msg, bot):
+    chat = job['chat']
+    lst_msg_id = job['last_msg_id']
+    skip = job['current']
+    total_files = job['total_files']
+    duplicate = job['duplicate']
+    errors = job['errors']
+    deleted = job['deleted']
+    no_media = job['no_media']
+    unsupported = job['unsupported']
     async with lock:
+        # One task fetches messages while this one sorts them and saves media in batches.
+        queue = asyncio.Queue(maxsize=INDEX_BATCH_SIZE * 2)
+
+        async def fetch_messages():
+            try:
+                async for message in bot.iter_messages(chat, lst_msg_id, skip):
+                    if temp.CANCEL:
+                        break
+                    await queue.put(message)
+            except Exception:
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        async def save_checkpoint(position):
+            # Only called when no fetched media is waiting in a batch, so a restart resumes from position.
+            nonlocal checkpoint
+            checkpoint = position
+            await db.update_index_job(job['_id'], {
+                'current': position,
+                'total_files': total_files,
+                'duplicate': duplicate,
+                'deleted': deleted,
+                'no_media': no_media,
+                'unsupported': unsupported,
+                'errors': errors
+            })
+
+        fetcher = None
+        current = skip
+        checkpoint = skip
+        batch = []
         try:
-            current = temp.CURRENT
             temp.CANCEL = False
-            async for message in bot.iter_messages(chat, lst_msg_id, temp.CURRENT):
-                if temp.CANCEL:
-                    await msg.edit(f"Successfully Cancelled!!\n\nSaved <code>{total_files}</code> files to dataBase!\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>")
+            await msg.edit(
+                "Starting Indexing",
+                reply_markup=InlineKeyboardMarkup(
+                    [[InlineKeyboardButton('Cancel', callback_data='index_cancel')]]
+                )
+            )
+            start_time = time.time()
+            fetcher = asyncio.create_task(fetch_messages())
+            while True:
+                message = await queue.get()
+                if message is None:
                     break
+                if temp.CANCEL:
+                    continue
                 current += 1
                 if current % 30 == 0:
+                    speed = (current - skip) / max(time.time() - start_time, 1)
+                    if not batch:
+                        await save_checkpoint(current - 1)
                     can = [[InlineKeyboardButton('Cancel', callback_data='index_cancel')]]
                     reply = InlineKeyboardMarkup(can)
                     try:
                         await msg.edit_text(
-                            text=f"Total messages fetched: <code>{current}</code>\nTotal messages saved: <code>{total_files}</code>\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>",
+                            text=f"Total messages fetched: <code>{current}</code>\nTotal messages saved: <code>{total_files}</code>\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>\nSpeed: <code>{speed:.1f}</code> messages/sec",
                             reply_markup=reply
                         )
                     except MessageNotModified:
@@ -173,17 +286,53 @@ async def index_files_to_db(lst_msg_id, chat, msg, bot):
                     unsupported += 1
                     continue
                 media.caption = message.caption
-                aynav, vnay = await save_file(media)
-                if aynav:
-                    total_files += 1
-                elif vnay == 0:
-                    duplicate += 1
-                elif vnay == 2:
-                    errors += 1
+                batch.append(media)
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    saved, skipped, failed = await save_files(batch)
+                    total_files += saved
+                    duplicate += skipped
+                    errors += failed
+                    batch = []
+                    await save_checkpoint(current)
+            await fetcher
+            if batch:
+                saved, skipped, failed = await save_files(batch)
+                total_files += saved
+                duplicate += skipped
+                errors += failed
         except Exception as e:
             logger.exception(e)
-            k = await msg.edit(f'Error: {e}')
+            if fetcher:
+                fetcher.cancel()
+            if batch:
+                # Save the media fetched so far, otherwise the skip number below would jump past it
+                try:
+                    saved, skipped, failed = await save_files(batch)
+                    total_files += saved
+                    duplicate += skipped
+                    errors += failed
+                    batch = []
+                except Exception as flush_error:
+                    logger.exception(flush_error)
+            if not batch:
+                # The message being handled when the error hit may not be saved, so it is fetched again
+                checkpoint = max(current - 1, checkpoint)
+            # Keep the job so it can be retried from its checkpoint, it is also requeued on restart
+            await save_checkpoint(checkpoint)
+            await db.update_index_job(job['_id'], {'failed': str(e)})
+            k = await msg.edit(
+                f'Error: {e}',
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton('Retry', callback_data=f"index_retry#{job['_id']}"),
+                    InlineKeyboardButton('Discard', callback_data=f"index_discard#{job['_id']}")
+                ]])
+            )
             await k.reply_text(f'Succesfully saved <code>{total_files}</code> to dataBase!\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>')
-            await k.reply_text("**If You Get Message Not Modified Error Then Skip Your Saved File Then Index Again**")
+            await k.reply_text(f"**If You Get Message Not Modified Error Then Skip Your Saved File Then Index Again**\n\nTo Continue From Here Use - <code>/setskip {checkpoint}</code>")
         else:
-            await msg.edit(f'Succesfully saved <code>{total_files}</code> to dataBase!\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>')
+            await db.delete_index_job(job['_id'])
+            speed = (current - skip) / max(time.time() - start_time, 1)
+            if temp.CANCEL:
+                await msg.edit(f"Successfully Cancelled!!\n\nSaved <code>{total_files}</code> files to dataBase!\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>")
+            else:
+                await msg.edit(f'Succesfully saved <code>{total_files}</code> to dataBase!\nDuplicate Files Skipped: <code>{duplicate}</code>\nDeleted Messages Skipped: <code>{deleted}</code>\nNon-Media messages skipped: <code>{no_media + unsupported}</code>(Unsupported Media - `{unsupported}` )\nErrors Occurred: <code>{errors}</code>\nSpeed: <code>{speed:.1f}</code> messages/sec')
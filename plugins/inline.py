@@ -54,7 +54,7 @@ async def answer(bot, query):
         string = query.query.strip()
         file_type = None
 
-    offset = int(query.offset or 0)
+    offset = query.offset or 0
     reply_markup = get_reply_markup(query=string)
     files, next_offset, total = await get_search_results(chat_id, string, file_type=file_type, max_results=10, offset=offset)
 
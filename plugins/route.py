@@ -1,18 +1,40 @@
 
 
 import re, math, logging, secrets, mimetypes, time
+from email.utils import formatdate, parsedate_to_datetime
 from info import *
 from aiohttp import web
 from aiohttp.http_exceptions import BadStatusLine
-from Zahid.bot import multi_clients, work_loads, ZahidXBot
+from Zahid.bot import multi_clients, work_loads, work_bytes, client_speeds, ZahidXBot
 from Zahid.server.exceptions import FIleNotFound, InvalidHash
+from Zahid.server.limits import get_client_ip, check_stream_limits, serve_stream
 from Zahid import StartTime, __version__
-from Zahid.util.custom_dl import ByteStreamer
+from Zahid.util.custom_dl import ByteStreamer, file_properties_cache
+from Zahid.bot.clients import select_client
 from Zahid.util.time_format import get_readable_time
 from Zahid.util.render_template import render_page
+from Zahid.util.chunk_cache import chunk_cache
+from Zahid.util.metrics import Counter, Gauge, render_metrics
+from database.ia_filterdb import count_cache, result_cache, get_search_cache_stats
 
 routes = web.RouteTableDef()
 
+
+def per_client(values):
+    return {(("client", index),): value for index, value in values.items()}
+
+def cache_counts(attr):
+    caches = {"search_count": count_cache, "search_result": result_cache, "file_properties": file_properties_cache}
+    if chunk_cache:
+        caches["stream_chunk"] = chunk_cache
+    return {(("cache", name),): getattr(cache, attr) for name, cache in caches.items()}
+
+Gauge("stream_active", "Streams being served by each client.", lambda: per_client(work_loads))
+Gauge("stream_pending_bytes", "Bytes each client still has to stream.", lambda: per_client(work_bytes))
+Gauge("stream_client_speed_bytes", "Recent streaming throughput of each client in bytes/sec.", lambda: per_client(client_speeds))
+Counter("cache_hits_total", "Lookups answered from each cache.", lambda: cache_counts("hits"))
+Counter("cache_misses_total", "Lookups each cache had to fetch.", lambda: cache_counts("misses"))
+
 @routes.get("/", allow_head=True)
 async def root_route_handler(request):
    return web.json_response(
@@ -20,9 +42,15 @@ async def root_route_handler(request):
             "server_status": "Running Advanced-Telegram-Audiobook FileShare Bot",
             "uptime": get_readable_time(time.time() - StartTime),
             "version": __version__,
+            "file_properties_cache": file_properties_cache.stats(),
+            "search_cache": get_search_cache_stats(),
         }
     )
 
+@routes.get("/metrics")
+async def metrics_handler(request):
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8", headers={"Cache-Control": "no-store"})
+
 @routes.get(r"/watch/{path:\S+}", allow_head=True)
 async def stream_handler(request: web.Request):
     try:
@@ -69,60 +97,145 @@ async def stream_handler(request: web.Request):
 
 class_cache = {}
 
-async def media_streamer(request: web.Request, id: int, secure_hash: str):
-    range_header = request.headers.get("Range", 0)
-    
-    index = min(work_loads, key=work_loads.get)
+def get_streamer(index):
     faster_client = multi_clients[index]
-    
-    if MULTI_CLIENT:
-        logging.info(f"Client {index} is now serving {request.remote}")
-
     if faster_client in class_cache:
-        tg_connect = class_cache[faster_client]
         logging.debug(f"Using cached ByteStreamer object for client {index}")
     else:
         logging.debug(f"Creating new ByteStreamer object for client {index}")
-        tg_connect = ByteStreamer(faster_client)
-        class_cache[faster_client] = tg_connect
-    logging.debug("before calling get_file_properties")
-    file_id = await tg_connect.get_file_properties(id)
-    logging.debug("after calling get_file_properties")
-    
-    if file_id.unique_id[:6] != secure_hash:
-        logging.debug(f"Invalid hash for message with ID {id}")
-        raise InvalidHash
-    
-    file_size = file_id.file_size
+        class_cache[faster_client] = ByteStreamer(faster_client)
+    return class_cache[faster_client]
 
-    if range_header:
-        from_bytes, until_bytes = range_header.replace("bytes=", "").split("-")
-        from_bytes = int(from_bytes)
-        until_bytes = int(until_bytes) if until_bytes else file_size - 1
-    else:
-        from_bytes = request.http_range.start or 0
-        until_bytes = (request.http_range.stop or file_size) - 1
+def get_cache_control(mime_type):
+    """Cache-Control for a mime type from STREAM_CACHE_CONTROL, most specific rule first."""
+    for rule in (mime_type, f"{mime_type.split('/')[0]}/*", "*"):
+        if rule in STREAM_CACHE_CONTROL:
+            return STREAM_CACHE_CONTROL[rule]
+    return None
 
-    if (until_bytes > file_size) or (from_bytes < 0) or (until_bytes < from_bytes):
-        return web.Response(
-            status=416,
-            body="416: Range not satisfiable",
-            headers={"Content-Range": f"bytes */{file_size}"},
-        )
+def parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def is_not_modified(request, etag, modified):
+    """Whether the client's cached copy is still valid, If-None-Match wins over If-Modified-Since."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    since = parse_http_date(request.headers.get("If-Modified-Since"))
+    return bool(modified and since and modified <= since)
+
+def is_range_valid(request, etag, modified):
+    """Whether a Range request may be honoured, If-Range needs a strong ETag or the exact date."""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return bool(modified) and parse_http_date(if_range) == modified
 
-    chunk_size = 1024 * 1024
-    until_bytes = min(until_bytes, file_size - 1)
+MAX_RANGES = 16
 
+def parse_ranges(range_header, file_size):
+    """Parse a bytes Range header into inclusive (start, end) pairs, dropping unsatisfiable ones.
+    Raises ValueError for a malformed header, which is then ignored like no Range at all.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes":
+        raise ValueError(range_header)
+    ranges = []
+    for part in spec.split(","):
+        start, sep, end = part.strip().partition("-")
+        if not sep:
+            raise ValueError(range_header)
+        if not start:
+            # Suffix range, the last N bytes, used by players to read trailing metadata
+            length = int(end)
+            if length > 0 and file_size:
+                ranges.append((max(file_size - length, 0), file_size - 1))
+            continue
+        start = int(start)
+        end = int(end) if end else max(start, file_size - 1)
+        if end < start:
+            raise ValueError(range_header)
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+    return ranges
+
+def stream_range(tg_connect, file_id, index, from_bytes, until_bytes, chunk_size=1024 * 1024):
     offset = from_bytes - (from_bytes % chunk_size)
     first_part_cut = from_bytes - offset
     last_part_cut = until_bytes % chunk_size + 1
-
-    req_length = until_bytes - from_bytes + 1
-    part_count = math.ceil(until_bytes / chunk_size) - math.floor(offset / chunk_size)
-    body = tg_connect.yield_file(
+    part_count = until_bytes // chunk_size - offset // chunk_size + 1
+    return tg_connect.yield_file(
         file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size
     )
 
+def multipart_ranges(tg_connect, file_id, index, ranges, mime_type, file_size):
+    """Build a multipart/byteranges body and its exact length."""
+    boundary = secrets.token_hex(16)
+    heads = [
+        f"--{boundary}\r\nContent-Type: {mime_type}\r\nContent-Range: bytes {start}-{end}/{file_size}\r\n\r\n".encode()
+        for start, end in ranges
+    ]
+    tail = f"--{boundary}--\r\n".encode()
+    length = sum(len(head) + end - start + 1 + 2 for head, (start, end) in zip(heads, ranges)) + len(tail)
+
+    async def body():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            async for chunk in stream_range(tg_connect, file_id, index, start, end):
+                yield chunk
+            yield b"\r\n"
+        yield tail
+
+    return boundary, body(), length
+
+def get_cached_index(id):
+    """Index of a client that already has this file's properties cached, if any."""
+    for index, client in multi_clients.items():
+        if (client.name, id) in file_properties_cache.entries:
+            return index
+    return None
+
+async def media_streamer(request: web.Request, id: int, secure_hash: str):
+    range_header = request.headers.get("Range", "")
+    head_only = request.method == "HEAD"
+    if not head_only:
+        # Reject early, before any Telegram call, when this address or the server is at its limit
+        limited = check_stream_limits(get_client_ip(request))
+        if limited:
+            return limited
+
+    index = get_cached_index(id) if head_only else None
+    if index is None:
+        index = select_client()
+    tg_connect = get_streamer(index)
+    logging.debug("before calling get_file_properties")
+    file_id = await tg_connect.get_file_properties(id)
+    logging.debug("after calling get_file_properties")
+
+    if not head_only:
+        # Now that the file's DC is known, prefer a client that already has a media session there,
+        # unless it would have to fetch the file properties again
+        dc_index = select_client(file_id.dc_id)
+        if dc_index != index and (multi_clients[dc_index].name, id) in file_properties_cache.entries:
+            index = dc_index
+            tg_connect = get_streamer(index)
+            file_id = await tg_connect.get_file_properties(id)
+
+    if MULTI_CLIENT:
+        logging.info(f"Client {index} is now serving {request.remote}")
+    
+    if file_id.unique_id[:6] != secure_hash:
+        logging.debug(f"Invalid hash for message with ID {id}")
+        raise InvalidHash
+    
+    file_size = file_id.file_size
+
     mime_type = file_id.mime_type
     file_name = file_id.file_name
     disposition = "attachment"
@@ -135,19 +248,57 @@ async def media_streamer(request: web.Request, id: int, secure_hash: str):
                 file_name = f"{secrets.token_hex(2)}.unknown"
     else:
         if file_name:
-            mime_type = mimetypes.guess_type(file_id.file_name)
+            mime_type = mimetypes.guess_type(file_id.file_name)[0] or "application/octet-stream"
         else:
             mime_type = "application/octet-stream"
             file_name = f"{secrets.token_hex(2)}.unknown"
 
-    return web.Response(
-        status=206 if range_header else 200,
-        body=body,
-        headers={
-            "Content-Type": f"{mime_type}",
-            "Content-Range": f"bytes {from_bytes}-{until_bytes}/{file_size}",
-            "Content-Length": str(req_length),
-            "Content-Disposition": f'{disposition}; filename="{file_name}"',
-            "Accept-Ranges": "bytes",
-        },
-    )
+    # Telegram files never change, so the unique id is a strong validator
+    etag = f'"{file_id.unique_id}"'
+    modified = getattr(file_id, "date", None)
+    cache_headers = {"ETag": etag}
+    if modified:
+        cache_headers["Last-Modified"] = formatdate(modified, usegmt=True)
+    cache_control = get_cache_control(mime_type)
+    if cache_control:
+        cache_headers["Cache-Control"] = cache_control
+
+    if is_not_modified(request, etag, modified):
+        return web.Response(status=304, headers=cache_headers)
+
+    ranges = None
+    if range_header and is_range_valid(request, etag, modified):
+        try:
+            ranges = parse_ranges(range_header, file_size)
+        except ValueError:
+            # A malformed Range is ignored and the whole file is sent
+            ranges = None
+        if ranges is not None and not 0 < len(ranges) <= MAX_RANGES:
+            return web.Response(
+                status=416,
+                body="416: Range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
+
+    headers = {
+        "Content-Disposition": f'{disposition}; filename="{file_name}"',
+        "Accept-Ranges": "bytes",
+        **cache_headers,
+    }
+    if ranges and len(ranges) > 1:
+        boundary, body, length = multipart_ranges(tg_connect, file_id, index, ranges, mime_type, file_size)
+        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+    else:
+        from_bytes, until_bytes = ranges[0] if ranges else (0, file_size - 1)
+        length = until_bytes - from_bytes + 1
+        body = stream_range(tg_connect, file_id, index, from_bytes, until_bytes)
+        headers["Content-Type"] = f"{mime_type}"
+        if ranges:
+            headers["Content-Range"] = f"bytes {from_bytes}-{until_bytes}/{file_size}"
+    headers["Content-Length"] = str(length)
+
+    if head_only:
+        # The body generator is never started, so HEAD makes no download request
+        return web.Response(status=206 if ranges else 200, headers=headers)
+
+    return await serve_stream(request, 206 if ranges else 200, headers, body, file_id.unique_id, length)
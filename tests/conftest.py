@@ -0,0 +1,10 @@
+import os
+import sys
+
+# info.py reads its settings at import time; give the required ones harmless values
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "0" * 32)
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ.setdefault("DATABASE_URI", "mongodb://localhost:27017")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from plugins import route
+
+FILE_SIZE = 3 * 1024 * 1024 + 123
+DATA = bytes(i % 251 for i in range(FILE_SIZE))
+
+
+class StubStreamer:
+    """Serves DATA the way ByteStreamer.yield_file cuts Telegram chunks."""
+
+    def __init__(self):
+        self.file_id = SimpleNamespace(
+            dc_id=2,
+            unique_id="AgADabcdEF",
+            file_size=FILE_SIZE,
+            mime_type="video/mp4",
+            file_name="test.mp4",
+            date=1700000000,
+        )
+        self.downloads = 0
+
+    async def get_file_properties(self, id):
+        return self.file_id
+
+    async def yield_file(self, file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size):
+        self.downloads += 1
+        for current_part in range(1, part_count + 1):
+            chunk = DATA[offset:offset + chunk_size]
+            offset += chunk_size
+            if part_count == 1:
+                yield chunk[first_part_cut:last_part_cut]
+            elif current_part == 1:
+                yield chunk[first_part_cut:]
+            elif current_part == part_count:
+                yield chunk[:last_part_cut]
+            else:
+                yield chunk
+
+
+async def collect(body):
+    return b"".join([chunk async for chunk in body])
+
+
+@pytest.fixture
+def streamer(monkeypatch):
+    streamer = StubStreamer()
+    monkeypatch.setattr(route, "get_streamer", lambda index: streamer)
+    monkeypatch.setattr(route, "get_cached_index", lambda id: 0)
+    monkeypatch.setattr(route, "select_client", lambda dc_id=None: 0)
+    monkeypatch.setattr(route, "STREAM_CACHE_CONTROL", {})
+    return streamer
+
+
+def test_parse_ranges_single_and_open_ended():
+    assert route.parse_ranges("bytes=0-99", 1000) == [(0, 99)]
+    assert route.parse_ranges("bytes=900-", 1000) == [(900, 999)]
+    assert route.parse_ranges("bytes=500-5000", 1000) == [(500, 999)]
+
+
+def test_parse_ranges_suffix():
+    assert route.parse_ranges("bytes=-100", 1000) == [(900, 999)]
+    assert route.parse_ranges("bytes=-5000", 1000) == [(0, 999)]
+    assert route.parse_ranges("bytes=-0", 1000) == []
+
+
+def test_parse_ranges_multiple_drops_unsatisfiable():
+    assert route.parse_ranges("bytes=0-9, 20-29, 2000-3000, -5", 1000) == [(0, 9), (20, 29), (995, 999)]
+    assert route.parse_ranges("bytes=1000-", 1000) == []
+
+
+@pytest.mark.parametrize("header", ["items=0-9", "bytes=5", "bytes=9-0", "bytes=a-b"])
+def test_parse_ranges_malformed(header):
+    with pytest.raises(ValueError):
+        route.parse_ranges(header, 1000)
+
+
+def test_multipart_ranges_length_and_body(streamer):
+    ranges = [(0, 9), (1024 * 1024 - 5, 1024 * 1024 + 4), (FILE_SIZE - 7, FILE_SIZE - 1)]
+    boundary, body, length = route.multipart_ranges(streamer, streamer.file_id, 0, ranges, "video/mp4", FILE_SIZE)
+    data = asyncio.run(collect(body))
+
+    assert len(data) == length
+    assert data.endswith(f"--{boundary}--\r\n".encode())
+    parts = data.split(f"--{boundary}".encode())[1:-1]
+    assert len(parts) == len(ranges)
+    for part, (start, end) in zip(parts, ranges):
+        head, _, content = part.partition(b"\r\n\r\n")
+        assert f"Content-Range: bytes {start}-{end}/{FILE_SIZE}".encode() in head
+        assert content == DATA[start:end + 1] + b"\r\n"
+
+
+def head_request(streamer, range_header=None):
+    headers = {"Range": range_header} if range_header else {}
+    request = make_mocked_request("HEAD", "/AgADab123", headers=headers)
+    return asyncio.run(route.media_streamer(request, 123, "AgADab"))
+
+
+def test_head_whole_file(streamer):
+    response = head_request(streamer)
+    assert response.status == 200
+    assert response.headers["Content-Length"] == str(FILE_SIZE)
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == '"AgADabcdEF"'
+    assert streamer.downloads == 0
+
+
+def test_head_suffix_range(streamer):
+    response = head_request(streamer, "bytes=-100")
+    assert response.status == 206
+    assert response.headers["Content-Range"] == f"bytes {FILE_SIZE - 100}-{FILE_SIZE - 1}/{FILE_SIZE}"
+    assert response.headers["Content-Length"] == "100"
+    assert streamer.downloads == 0
+
+
+def test_head_multi_range(streamer):
+    response = head_request(streamer, "bytes=0-9,-10")
+    assert response.status == 206
+    assert response.headers["Content-Type"].startswith("multipart/byteranges; boundary=")
+    boundary = response.headers["Content-Type"].split("boundary=")[1]
+    expected = sum(
+        len(f"--{boundary}\r\nContent-Type: video/mp4\r\nContent-Range: bytes {start}-{end}/{FILE_SIZE}\r\n\r\n") + end - start + 1 + 2
+        for start, end in [(0, 9), (FILE_SIZE - 10, FILE_SIZE - 1)]
+    ) + len(f"--{boundary}--\r\n")
+    assert response.headers["Content-Length"] == str(expected)
+    assert streamer.downloads == 0
+
+
+def test_head_unsatisfiable_range(streamer):
+    response = head_request(streamer, f"bytes={FILE_SIZE}-")
+    assert response.status == 416
+    assert response.headers["Content-Range"] == f"bytes */{FILE_SIZE}"
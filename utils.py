@@ -1,6 +1,6 @@
 
 
-import logging, asyncio, os, re, random, pytz, aiohttp, requests, string, json, http.client
+import logging, asyncio, os, re, random, pytz, aiohttp, requests, string, json, http.client, time
 from info import *
 from imdb import Cinemagoer 
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
@@ -11,9 +11,11 @@ from Script import script
 from datetime import datetime, date
 from typing import List
 from database.users_chats_db import db
+from database.ia_filterdb import get_file_db_stats
 from database.join_reqs import JoinReqs
 from bs4 import BeautifulSoup
 from shortzy import Shortzy
+from Zahid.util.metrics import record_floodwait
 
 
 logger = logging.getLogger(__name__)
@@ -44,6 +46,7 @@ class temp(object):
     GETALL = {}
     SHORT = {}
     SETTINGS = {}
+    SETTINGS_WRITES = 0
     IMDB_CAP = {}
 
 
@@ -290,41 +293,67 @@ async def get_poster(query, bulk=False, id=False, file=None):
     }
 
 
-async def broadcast_messages(user_id, message):
-    try:
-        await message.copy(chat_id=user_id)
-        return True, "Success"
-    except FloodWait as e:
-        await asyncio.sleep(e.x)
-        return await broadcast_messages(user_id, message)
-    except InputUserDeactivated:
-        await db.delete_user(int(user_id))
-        logging.info(f"{user_id}-Removed from Database, since deleted account.")
-        return False, "Deleted"
-    except UserIsBlocked:
-        await db.delete_user(int(user_id))
-        logging.info(f"{user_id} -Blocked the bot.")
-        return False, "Blocked"
-    except PeerIdInvalid:
-        await db.delete_user(int(user_id))
-        logging.info(f"{user_id} - PeerIdInvalid")
-        return False, "Error"
-    except Exception as e:
-        return False, "Error"
+DEAD_USER_STATUSES = ("Deleted", "Blocked", "Invalid")
 
-async def broadcast_messages_group(chat_id, message):
-    try:
-        kd = await message.copy(chat_id=chat_id)
+def can_resend(message):
+    """Whether another bot client can send this message again without access to its chat."""
+    if not message.media:
+        return bool(message.text)
+    return bool(getattr(getattr(message, message.media.value, None), 'file_id', None))
+
+async def resend_message(client, chat_id, message):
+    """Send message from another bot client, media is sent again by its file_id."""
+    if message.media:
+        media = getattr(message, message.media.value)
+        return await client.send_cached_media(chat_id, media.file_id, caption=message.caption or "", caption_entities=message.caption_entities, reply_markup=message.reply_markup)
+    return await client.send_message(chat_id, message.text, entities=message.entities, reply_markup=message.reply_markup)
+
+async def broadcast_messages(user_id, message, retries=5, client=None, limiter=None):
+    for _ in range(retries):
         try:
-            await kd.pin()
-        except:
-            pass
-        return True, "Success"
-    except FloodWait as e:
-        await asyncio.sleep(e.x)
-        return await broadcast_messages_group(chat_id, message)
-    except Exception as e:
-        return False, "Error"
+            # Every attempt takes a token, so workers waking from a FloodWait do not all resend at once
+            if limiter:
+                await limiter.acquire()
+            if client:
+                await resend_message(client, user_id, message)
+            else:
+                await message.copy(chat_id=user_id)
+            return True, "Success"
+        except FloodWait as e:
+            # Only this send waits, the other broadcast workers keep going
+            record_floodwait(e.value)
+            await asyncio.sleep(e.value)
+        # Dead users are removed by the caller in batches, see DEAD_USER_STATUSES
+        except InputUserDeactivated:
+            logging.info(f"{user_id}-Deleted account.")
+            return False, "Deleted"
+        except UserIsBlocked:
+            logging.info(f"{user_id} -Blocked the bot.")
+            return False, "Blocked"
+        except PeerIdInvalid:
+            logging.info(f"{user_id} - PeerIdInvalid")
+            return False, "Invalid"
+        except Exception as e:
+            return False, "Error"
+    return False, "Error"
+
+async def broadcast_messages_group(chat_id, message, retries=5, limiter=None):
+    for _ in range(retries):
+        try:
+            if limiter:
+                await limiter.acquire()
+            kd = await message.copy(chat_id=chat_id)
+            try:
+                await kd.pin()
+            except:
+                pass
+            return True, "Success"
+        except FloodWait as e:
+            record_floodwait(e.value)
+            await asyncio.sleep(e.value)
+        except Exception as e:
+            return False, "Error"
+    return False, "Error"
     
 async def search_gagala(text):
     usr_agent = {
@@ -339,15 +368,48 @@ async def search_gagala(text):
     titles = soup.find_all( 'h3' )
     return [title.getText() for title in titles]
 
+def cache_settings(group_id, settings):
+    temp.SETTINGS.pop(int(group_id), None)
+    temp.SETTINGS[int(group_id)] = (time.monotonic() + SETTINGS_CACHE_TIME, settings)
+    while len(temp.SETTINGS) > SETTINGS_CACHE_SIZE:
+        temp.SETTINGS.pop(next(iter(temp.SETTINGS)))
+
+def clear_settings_cache(group_id=None):
+    temp.SETTINGS_WRITES += 1
+    if group_id is None:
+        temp.SETTINGS.clear()
+    else:
+        temp.SETTINGS.pop(int(group_id), None)
+
 async def get_settings(group_id):
-    settings = await db.get_settings(group_id)
-    return settings
+    cached = temp.SETTINGS.get(int(group_id))
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
+    writes = temp.SETTINGS_WRITES
+    settings = dict(await db.get_settings(group_id))
+    # A settings write finished while this read was in flight, so the value read may be stale
+    if writes == temp.SETTINGS_WRITES:
+        cache_settings(group_id, settings)
+    return dict(settings)
     
 async def save_group_settings(group_id, key, value):
-    current = await get_settings(group_id)
-    current.update({key: value})
-    await db.update_settings(group_id, current)
+    await db.update_setting(group_id, key, value)
+    temp.SETTINGS_WRITES += 1
+    cached = temp.SETTINGS.get(int(group_id))
+    if cached and cached[0] > time.monotonic():
+        cached[1][key] = value
+    else:
+        clear_settings_cache(group_id)
     
+async def get_file_dbs_status():
+    """Return the total file count and a status section for every file database."""
+    file_dbs = await get_file_db_stats()
+    sections = "".join(
+        script.FILE_DB_STATUS_TXT.format(number, files, round(used, 2), round(512 - used, 2))
+        for number, (files, used) in enumerate(file_dbs, start=1)
+    )
+    return sum(files for files, _ in file_dbs), sections
+
 def get_size(size):
     units = ["Bytes", "KB", "MB", "GB", "TB", "PB", "EB"]
     size = float(size)